@@ -0,0 +1,317 @@
+"""
+Incrementally maintained aggregates over FeeTransaction.
+
+Every code path that writes FeeTransaction rows calls into this module
+inside the same transaction.atomic block, so the summary tables never
+drift from the raw payments. Deltas are applied with F() expressions,
+which keeps concurrent cashiers from overwriting each other's totals.
+
+    StudentFeePaidTotal     (student, fee head, installment) -> paid, last date
+    DailyCollectionSummary  (date, session, class, fee head, installment, mode) -> amount, count
+"""
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from students.models import Student
+from .models import DailyCollectionSummary, FeeHead, FeeTransaction, Receipt, StudentFeePaidTotal
+
+
+def _paid_key(t):
+    return (t.student_id, t.fee_head_id, int(t.installment_number))
+
+
+def _group_paid_deltas(transactions, sign):
+    # Map: (student_id, fee_head_id, installment_number) -> [amount, count, last_date]
+    deltas = {}
+    for t in transactions:
+        if t.fee_head_id is None:
+            continue
+        key = _paid_key(t)
+        entry = deltas.setdefault(key, [Decimal('0'), 0, None])
+        entry[0] += sign * Decimal(str(t.amount_paid))
+        entry[1] += sign
+        if t.payment_date and (entry[2] is None or t.payment_date > entry[2]):
+            entry[2] = t.payment_date
+    return deltas
+
+
+def _apply_paid_deltas(deltas):
+    for (student_id, fee_head_id, inst), (amount, count, last_date) in deltas.items():
+        rows = StudentFeePaidTotal.objects.filter(
+            student_id=student_id, fee_head_id=fee_head_id, installment_number=inst
+        )
+        updates = {
+            'amount_paid': F('amount_paid') + amount,
+            'payment_count': F('payment_count') + count,
+        }
+        if count > 0 and last_date:
+            latest = Value(last_date, output_field=DateField())
+            updates['last_payment_date'] = Greatest(Coalesce('last_payment_date', latest), latest)
+
+        if rows.update(**updates) or count <= 0:
+            # Nothing to create when reversing a key that has no row;
+            # rebuild_paid_totals reports that kind of drift.
+            continue
+        try:
+            with transaction.atomic():
+                StudentFeePaidTotal.objects.create(
+                    student_id=student_id,
+                    fee_head_id=fee_head_id,
+                    installment_number=inst,
+                    amount_paid=amount,
+                    payment_count=count,
+                    last_payment_date=last_date,
+                )
+        except IntegrityError:
+            # Another request created the row first
+            rows.update(**updates)
+
+
+PAID_KEY_FIELDS = ['student', 'fee_head', 'installment_number']
+DAILY_KEY_FIELDS = ['date', 'session', 'student_class', 'fee_head', 'installment_number', 'payment_mode']
+
+
+def _bulk_write(model, existing, new, key_fields, value_fields, fallback):
+    """
+    Write recomputed rows back in a couple of statements. Rows in `existing` are
+    locked by the caller, so overwriting them with an upsert is safe; rows in
+    `new` may race with another request and fall back to the per-key F() path.
+    """
+    model.objects.bulk_create(
+        existing, batch_size=1000, update_conflicts=True, unique_fields=key_fields, update_fields=value_fields,
+    )
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(new.values(), batch_size=1000)
+    except IntegrityError:
+        # Another request created some of these keys first
+        fallback(list(new))
+
+
+def _apply_paid_deltas_bulk(deltas):
+    """Positive deltas for many keys at once: lock the existing rows, add in Python, write back in bulk."""
+    locked = StudentFeePaidTotal.objects.select_for_update().filter(
+        student_id__in={k[0] for k in deltas}, fee_head_id__in={k[1] for k in deltas}
+    ).values_list('student_id', 'fee_head_id', 'installment_number', 'amount_paid', 'payment_count', 'last_payment_date')
+    current = {(s_id, h_id, inst): (amount, count, last) for s_id, h_id, inst, amount, count, last in locked}
+
+    existing, new = [], {}
+    for key, (amount, count, last_date) in deltas.items():
+        if key in current:
+            old_amount, old_count, old_last = current[key]
+            amount += old_amount
+            count += old_count
+            if old_last and (last_date is None or old_last > last_date):
+                last_date = old_last
+        row = StudentFeePaidTotal(
+            student_id=key[0], fee_head_id=key[1], installment_number=key[2],
+            amount_paid=amount, payment_count=count, last_payment_date=last_date,
+        )
+        if key in current:
+            existing.append(row)
+        else:
+            new[key] = row
+
+    _bulk_write(
+        StudentFeePaidTotal, existing, new, PAID_KEY_FIELDS, ['amount_paid', 'payment_count', 'last_payment_date'],
+        lambda keys: _apply_paid_deltas({key: deltas[key] for key in keys}),
+    )
+
+
+def _transaction_context(transactions):
+    """Class, session and payment mode for each transaction, in three small queries."""
+    student_ids = {t.student_id for t in transactions}
+    head_ids = {t.fee_head_id for t in transactions if t.fee_head_id}
+    receipt_ids = {t.receipt_id for t in transactions if t.receipt_id}
+    classes = dict(Student.objects.filter(id__in=student_ids).values_list('id', 'student_class'))
+    sessions = dict(FeeHead.objects.filter(id__in=head_ids).values_list('id', 'session'))
+    modes = dict(Receipt.objects.filter(id__in=receipt_ids).values_list('id', 'payment_mode')) if receipt_ids else {}
+    return classes, sessions, modes
+
+
+def _group_daily_deltas(transactions, sign, student_class=None):
+    transactions = [t for t in transactions if t.fee_head_id is not None]
+    if not transactions:
+        return {}
+    classes, sessions, modes = _transaction_context(transactions)
+    # Map: (date, session, student_class, fee_head_id, installment_number, payment_mode) -> [amount, count]
+    deltas = {}
+    for t in transactions:
+        key = (
+            t.payment_date,
+            sessions.get(t.fee_head_id, ''),
+            student_class or classes.get(t.student_id, ''),
+            t.fee_head_id,
+            int(t.installment_number),
+            modes.get(t.receipt_id, ''),
+        )
+        entry = deltas.setdefault(key, [Decimal('0'), 0])
+        entry[0] += sign * Decimal(str(t.amount_paid))
+        entry[1] += sign
+    return deltas
+
+
+def _apply_daily_deltas(deltas):
+    for (day, session, student_class, fee_head_id, inst, mode), (amount, count) in deltas.items():
+        rows = DailyCollectionSummary.objects.filter(
+            date=day, session=session, student_class=student_class,
+            fee_head_id=fee_head_id, installment_number=inst, payment_mode=mode,
+        )
+        updates = {
+            'amount': F('amount') + amount,
+            'transaction_count': F('transaction_count') + count,
+        }
+        if rows.update(**updates):
+            if count < 0:
+                rows.filter(transaction_count__lte=0).delete()
+            continue
+        if count <= 0:
+            # Reversing a key that has no row; rebuild_daily_collections reports it.
+            continue
+        try:
+            with transaction.atomic():
+                DailyCollectionSummary.objects.create(
+                    date=day, session=session, student_class=student_class,
+                    fee_head_id=fee_head_id, installment_number=inst, payment_mode=mode,
+                    amount=amount, transaction_count=count,
+                )
+        except IntegrityError:
+            rows.update(**updates)
+
+
+def _apply_daily_deltas_bulk(deltas):
+    """Bulk counterpart of _apply_daily_deltas for positive deltas (see _apply_paid_deltas_bulk)."""
+    locked = DailyCollectionSummary.objects.select_for_update().filter(
+        date__in={k[0] for k in deltas}, fee_head_id__in={k[3] for k in deltas}
+    ).values_list('date', 'session', 'student_class', 'fee_head_id', 'installment_number', 'payment_mode',
+                  'amount', 'transaction_count')
+    current = {tuple(key): (amount, count) for *key, amount, count in locked}
+
+    existing, new = [], {}
+    for key, (amount, count) in deltas.items():
+        if key in current:
+            amount += current[key][0]
+            count += current[key][1]
+        day, session, student_class, fee_head_id, inst, mode = key
+        row = DailyCollectionSummary(
+            date=day, session=session, student_class=student_class,
+            fee_head_id=fee_head_id, installment_number=inst, payment_mode=mode,
+            amount=amount, transaction_count=count,
+        )
+        if key in current:
+            existing.append(row)
+        else:
+            new[key] = row
+
+    _bulk_write(
+        DailyCollectionSummary, existing, new, DAILY_KEY_FIELDS, ['amount', 'transaction_count'],
+        lambda keys: _apply_daily_deltas({key: deltas[key] for key in keys}),
+    )
+
+
+# Above this many keys, record_payments switches from one UPDATE per key to bulk writes
+BULK_DELTA_THRESHOLD = 50
+
+
+def record_payments(transactions):
+    """Add newly saved FeeTransaction rows to the aggregates."""
+    transactions = list(transactions)
+    paid = _group_paid_deltas(transactions, 1)
+    daily = _group_daily_deltas(transactions, 1)
+    if len(paid) > BULK_DELTA_THRESHOLD:
+        _apply_paid_deltas_bulk(paid)
+    else:
+        _apply_paid_deltas(paid)
+    if len(daily) > BULK_DELTA_THRESHOLD:
+        _apply_daily_deltas_bulk(daily)
+    else:
+        _apply_daily_deltas(daily)
+
+
+def reverse_payments(transactions):
+    """
+    Remove FeeTransaction rows from the aggregates.
+    Call before the rows (or their receipt) are deleted, while their context still exists.
+    """
+    transactions = list(transactions)
+    _apply_daily_deltas(_group_daily_deltas(transactions, -1))
+
+    deltas = _group_paid_deltas(transactions, -1)
+    if not deltas:
+        return
+    _apply_paid_deltas(deltas)
+
+    removed_ids = [t.pk for t in transactions]
+    for student_id, fee_head_id, inst in deltas:
+        rows = StudentFeePaidTotal.objects.filter(
+            student_id=student_id, fee_head_id=fee_head_id, installment_number=inst
+        )
+        if rows.filter(payment_count__lte=0).delete()[0]:
+            continue
+        last = FeeTransaction.objects.filter(
+            student_id=student_id, fee_head_id=fee_head_id, installment_number=inst
+        ).exclude(id__in=removed_ids).aggregate(last=Max('payment_date'))['last']
+        rows.update(last_payment_date=last)
+
+
+_reversal = threading.local()
+
+
+@contextmanager
+def reversal_paused():
+    """Skip the reversal on delete, for code that clears the aggregate tables itself (see fees/synthetic.py)."""
+    _reversal.paused = True
+    try:
+        yield
+    finally:
+        _reversal.paused = False
+
+
+def reverse_deleted_payment(sender, instance, **kwargs):
+    """
+    pre_delete handler for FeeTransaction (see fees/signals.py). Covers direct
+    deletes and cascades from Student and Receipt deletes, in the API and the admin.
+    """
+    if not getattr(_reversal, 'paused', False):
+        reverse_payments([instance])
+
+
+def adjust_payment(trans, old_amount):
+    """Apply an in-place change of amount_paid on an existing FeeTransaction."""
+    if trans.fee_head_id is None:
+        return
+    delta = Decimal(str(trans.amount_paid)) - Decimal(str(old_amount))
+    if delta:
+        _apply_paid_deltas({_paid_key(trans): [delta, 0, None]})
+        _apply_daily_deltas({key: [delta, 0] for key in _group_daily_deltas([trans], 1)})
+
+
+def move_student_class(student_id, old_class, new_class):
+    """Re-file a student's collections under their new class after a class change."""
+    transactions = list(FeeTransaction.objects.filter(student_id=student_id, fee_head__isnull=False))
+    _apply_daily_deltas(_group_daily_deltas(transactions, -1, student_class=old_class))
+    _apply_daily_deltas(_group_daily_deltas(transactions, 1, student_class=new_class))
+
+
+def expected_daily_collections():
+    """DailyCollectionSummary rows recomputed from raw FeeTransaction data, keyed like the table."""
+    grouped = (
+        FeeTransaction.objects.filter(fee_head__isnull=False)
+        .values('payment_date', 'fee_head__session', 'student__student_class', 'fee_head_id',
+                'installment_number', 'receipt__payment_mode')
+        .annotate(amount=Sum('amount_paid'), count=Count('id'))
+        .order_by()
+    )
+    expected = {}
+    for row in grouped.iterator(chunk_size=2000):
+        key = (
+            row['payment_date'], row['fee_head__session'], row['student__student_class'],
+            row['fee_head_id'], row['installment_number'], row['receipt__payment_mode'] or '',
+        )
+        expected[key] = (row['amount'].quantize(Decimal('0.01')), row['count'])
+    return expected
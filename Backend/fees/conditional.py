@@ -0,0 +1,63 @@
+"""
+Conditional GET (ETag / Last-Modified) from DataVersion stamps.
+
+The validators come from the version counters in fees/versions.py, which
+are read with one small query. A request whose If-None-Match (or
+If-Modified-Since) still matches gets a 304 before any queryset is
+evaluated or serializer runs. Responses carry "Cache-Control: private,
+no-cache" so browsers keep them and revalidate on every use.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import DataVersion
+
+
+def version_stamps(keys):
+    """{key: (version, updated_at)} for the given keys; missing keys are (0, None)."""
+    rows = DataVersion.objects.filter(key__in=keys).values_list('key', 'version', 'updated_at')
+    stamps = {key: (0, None) for key in keys}
+    stamps.update({key: (version, updated_at) for key, version, updated_at in rows})
+    return stamps
+
+
+def conditional_get(request, keys, build_response, extra=()):
+    """
+    Return a 304 if the client's copy is current, otherwise build_response()
+    with ETag and Last-Modified set. `extra` is mixed into the ETag for inputs
+    that are not version stamps (e.g. the schedule version or today's date).
+    """
+    stamps = version_stamps(keys)
+    signature = repr((request.get_full_path(), sorted((k, v) for k, (v, _) in stamps.items()), extra))
+    etag = f'"{hashlib.sha1(signature.encode()).hexdigest()}"'
+    modified = [updated_at for _, updated_at in stamps.values() if updated_at]
+    last_modified = int(max(modified).timestamp()) if modified else None
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified['Cache-Control'] = 'private, no-cache'
+        return not_modified
+
+    response = build_response()
+    if response.status_code == 200:
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet mixin adding ETag / Last-Modified to list and retrieve.
+    Set conditional_version_keys to the DataVersion keys the serialized data depends on.
+    """
+    conditional_version_keys = ()
+
+    def list(self, request, *args, **kwargs):
+        return conditional_get(request, self.conditional_version_keys, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_get(request, self.conditional_version_keys, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
@@ -0,0 +1,147 @@
+"""
+Vectorized fee calculation engine.
+
+Turns a FeeSchedule into dense NumPy arrays so expected dues for thousands of
+students are computed with array operations instead of nested Python loops.
+All amounts are int64 paise, so sums are exact:
+
+    amounts      (C, H)     total amount per class and head
+    installments (C, H, I)  amount due per installment (remainder on the last)
+    applicable   (S, H)     class has an amount and, for transport heads, the route matches
+    opt-outs     (S, H, I)  students opted out of an installment (counts, so cohorts work too)
+    enrolled     (S, H, I)  weight - opt-outs, zero where the installment does not exist
+
+S is students (or cohorts with a weight), H fee heads, I the largest
+installment count of the session.
+"""
+import numpy as np
+
+
+class FeeEngine:
+    def __init__(self, schedule):
+        self.schedule = schedule
+        self.head_ids = [h.id for h in schedule.heads]
+        self.head_index = {head_id: i for i, head_id in enumerate(self.head_ids)}
+        self.classes = sorted({c for h in schedule.heads for c in h.amounts})
+        self.class_index = {c: i for i, c in enumerate(self.classes)}
+
+        n_heads = len(self.head_ids)
+        self.is_transport = np.array([h.is_transport_fee for h in schedule.heads], dtype=bool)
+        self.installment_counts = np.array([h.installment_count for h in schedule.heads], dtype=np.int64)
+        self.max_installments = int(self.installment_counts.max()) if n_heads else 1
+
+        # One extra all-zero row so unknown classes (index -1) apply to nothing
+        self.amounts = np.zeros((len(self.classes) + 1, n_heads), dtype=np.int64)
+        self.installment_amounts = np.zeros(self.amounts.shape + (self.max_installments,), dtype=np.int64)
+        self.present = np.zeros(self.amounts.shape, dtype=bool)
+        for j, head in enumerate(schedule.heads):
+            for class_name, amount in head.amounts.items():
+                i = self.class_index[class_name]
+                splits = head.installment_amounts[class_name]
+                self.amounts[i, j] = amount
+                self.installment_amounts[i, j, :len(splits)] = splits
+                self.present[i, j] = True
+
+        # (H, I): installment i+1 exists for head h
+        self.valid_installments = (
+            np.arange(1, self.max_installments + 1)[None, :] <= self.installment_counts[:, None]
+        )
+
+    def class_indices(self, class_names):
+        return np.array([self.class_index.get(c, -1) for c in class_names], dtype=np.int64)
+
+    def transport_mask(self, has_transport, transport_fee_head_ids):
+        """(S, H) True where a head applies as far as transport is concerned."""
+        route = np.array([self.head_index.get(h, -1) for h in transport_fee_head_ids], dtype=np.int64)
+        on_route = np.asarray(has_transport, dtype=bool)[:, None] & (
+            route[:, None] == np.arange(len(self.head_ids))[None, :]
+        )
+        return ~self.is_transport[None, :] | on_route
+
+    def opt_out_tensor(self, n_rows, opt_outs):
+        """
+        opt_outs: iterable of (row, fee_head_id, installment_number, count).
+        Keys outside the schedule are ignored, matching the default-enrolled rule.
+        """
+        tensor = np.zeros((n_rows, len(self.head_ids), self.max_installments), dtype=np.int64)
+        rows, cols, insts, counts = [], [], [], []
+        for row, fee_head_id, inst, count in opt_outs:
+            col = self.head_index.get(fee_head_id)
+            if col is None or not 1 <= inst <= self.max_installments:
+                continue
+            rows.append(row)
+            cols.append(col)
+            insts.append(inst - 1)
+            counts.append(count)
+        if rows:
+            np.add.at(tensor, (rows, cols, insts), counts)
+        return tensor
+
+    def compute(self, class_names, has_transport, transport_fee_head_ids, opt_outs=(), weights=None):
+        n_rows = len(class_names)
+        cls_idx = self.class_indices(class_names)
+        applicable = self.present[cls_idx] & self.transport_mask(has_transport, transport_fee_head_ids)
+        if weights is None:
+            weights = np.ones(n_rows, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.int64)
+
+        base = applicable[:, :, None] & self.valid_installments[None, :, :]
+        enrolled = base * weights[:, None, None] - self.opt_out_tensor(n_rows, opt_outs)
+        enrolled = np.where(base, np.maximum(enrolled, 0), 0)
+        return DueBreakdown(self, cls_idx, applicable, enrolled)
+
+
+class DueBreakdown:
+    def __init__(self, engine, cls_idx, applicable, enrolled):
+        self.engine = engine
+        self.applicable = applicable
+        self.enrolled = enrolled
+        # (S, H, I) paise due per installment for each row
+        self.installment_amounts = engine.installment_amounts[cls_idx]
+        self.amounts = engine.amounts[cls_idx]
+
+    def due_tensor(self):
+        """(S, H, I) paise due per row, head and installment."""
+        return self.enrolled * self.installment_amounts
+
+    def expected(self, installment=None):
+        """(S,) expected paise per row, optionally for a single installment."""
+        if installment is None:
+            return self.due_tensor().sum(axis=(1, 2))
+        if not 1 <= installment <= self.engine.max_installments:
+            return np.zeros(len(self.enrolled), dtype=np.int64)
+        i = installment - 1
+        return (self.enrolled[:, :, i] * self.installment_amounts[:, :, i]).sum(axis=1)
+
+    def paid_tensor(self, row_index, paid_rows):
+        """
+        (S, H, I) paise paid, from (student_key, fee_head_id, installment_number, paise) rows.
+        Payments for keys outside the schedule are ignored.
+        """
+        engine = self.engine
+        tensor = np.zeros(self.enrolled.shape, dtype=np.int64)
+        rows, cols, insts, amounts = [], [], [], []
+        for key, fee_head_id, inst, amount in paid_rows:
+            row = row_index.get(key)
+            col = engine.head_index.get(fee_head_id)
+            if row is None or col is None or not 1 <= inst <= engine.max_installments:
+                continue
+            rows.append(row)
+            cols.append(col)
+            insts.append(inst - 1)
+            amounts.append(amount)
+        if rows:
+            np.add.at(tensor, (rows, cols, insts), amounts)
+        return tensor
+
+
+_engines = {}
+
+
+def get_fee_engine(schedule):
+    """Engines are derived from a schedule, so they are cached per (session, schedule version)."""
+    engine = _engines.get(schedule.session)
+    if engine is None or engine.schedule.version != schedule.version:
+        engine = FeeEngine(schedule)
+        _engines[schedule.session] = engine
+    return engine
@@ -0,0 +1,200 @@
+"""
+CSV and XLSX exports that stream.
+
+An export is a header and a generator of rows read with .iterator(), so
+memory stays flat however many rows there are. CSV is sent through a
+StreamingHttpResponse while it is produced. XLSX is written in openpyxl's
+write_only mode, which keeps no cells around, into a temporary file that is
+then sent with FileResponse (an .xlsx is a zip and cannot go out before it
+is complete).
+
+build_export() takes the query parameters of the export endpoints, so a
+background job can rebuild the same export from its params.
+"""
+import csv
+import tempfile
+from collections import namedtuple
+from datetime import date, datetime
+
+import openpyxl
+from django.db.models import Case, IntegerField, Value, When
+from django.http import FileResponse, StreamingHttpResponse
+
+from students.models import CLASS_ORDER, Student
+from .models import FeeTransaction, Receipt, StudentFeeEnrollment, StudentFeePaidTotal
+from .money import paise_expr
+from .pending import pending_fee_details
+from .schedule import get_fee_schedule
+
+CHUNK_SIZE = 2000
+# Students per fee engine pass in the defaulters export
+DEFAULTER_BATCH = 2000
+# CSV lines per chunk handed to the response
+CSV_LINES_PER_CHUNK = 500
+
+FILE_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+Export = namedtuple('Export', ['name', 'header', 'rows'])
+
+
+def parse_date(value, default=None):
+    if not value:
+        return default
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+def date_range(params):
+    """(date_from, date_to) from ?date_from=&date_to=, both defaulting to today."""
+    today = date.today()
+    date_from = parse_date(params.get('date_from'), today)
+    date_to = parse_date(params.get('date_to'), today)
+    if date_from > date_to:
+        raise ValueError("date_from is after date_to")
+    return date_from, date_to
+
+
+def class_rank():
+    return Case(*[When(student_class=c, then=Value(i)) for i, c in enumerate(CLASS_ORDER)],
+                default=Value(len(CLASS_ORDER)), output_field=IntegerField())
+
+
+def defaulters_export(params):
+    """The pending_fees list (same session, student_class and show_all filters) by class and student id."""
+    session = params.get('session')
+    show_all = params.get('show_all') == 'true'
+    schedule = get_fee_schedule(session)
+    students = Student.objects.all()
+    if params.get('student_class'):
+        students = students.filter(student_class=params['student_class'])
+    installments = range(1, schedule.installment_count + 1)
+
+    def batch_rows(batch):
+        ids = [s['id'] for s in batch]
+        paid_rows = StudentFeePaidTotal.objects.filter(student_id__in=ids, fee_head_id__in=schedule.head_ids).annotate(
+            paid_paise=paise_expr('amount_paid')
+        ).values_list('student_id', 'fee_head_id', 'installment_number', 'paid_paise')
+        opt_out_rows = StudentFeeEnrollment.objects.filter(
+            student_id__in=ids, fee_head_id__in=schedule.head_ids, session=session, is_enrolled=False
+        ).values_list('student_id', 'fee_head_id', 'installment_number')
+        contacts = {s['id']: s['contact_number'] for s in batch}
+        for detail in pending_fee_details(schedule, batch, paid_rows, opt_out_rows, show_all=show_all):
+            by_installment = detail['installment_data']
+            yield [
+                detail['student_id'], detail['name'], detail['student_class'], contacts[detail['id']],
+                detail['total_due'], detail['total_paid'], detail['pending_amount'],
+            ] + [
+                round(sum(h['pending'] for h in by_installment.get(i, {'heads': {}})['heads'].values()), 2)
+                for i in installments
+            ]
+
+    def rows():
+        batch = []
+        for student in students.order_by(class_rank(), 'student_id').values(
+            'id', 'student_id', 'name', 'student_class', 'contact_number', 'has_transport', 'transport_fee_head_id'
+        ).iterator(chunk_size=CHUNK_SIZE):
+            batch.append(student)
+            if len(batch) >= DEFAULTER_BATCH:
+                yield from batch_rows(batch)
+                batch = []
+        if batch:
+            yield from batch_rows(batch)
+
+    header = ['Student ID', 'Name', 'Class', 'Contact', 'Total Due', 'Total Paid', 'Pending'] + [
+        f'Installment {i} Pending' for i in installments
+    ]
+    return Export(f"defaulters-{session or 'current'}", header, rows())
+
+
+def daybook_export(params):
+    """Every fee transaction between date_from and date_to, by date and receipt."""
+    date_from, date_to = date_range(params)
+    transactions = FeeTransaction.objects.filter(payment_date__range=[date_from, date_to])
+    if params.get('payment_mode'):
+        transactions = transactions.filter(receipt__payment_mode=params['payment_mode'])
+    rows = transactions.order_by('payment_date', 'receipt__receipt_no', 'id').values_list(
+        'payment_date', 'receipt__receipt_no', 'student__student_id', 'student__name', 'student__student_class',
+        'fee_head__name', 'fee_head__session', 'installment_number', 'amount_paid', 'receipt__payment_mode',
+    ).iterator(chunk_size=CHUNK_SIZE)
+    header = ['Date', 'Receipt No', 'Student ID', 'Name', 'Class', 'Fee Head', 'Session', 'Installment', 'Amount', 'Mode']
+    return Export(f'daybook-{date_from}-to-{date_to}', header, rows)
+
+
+def receipts_export(params):
+    """Receipts issued between date_from and date_to, by receipt number."""
+    date_from, date_to = date_range(params)
+    receipts = Receipt.objects.filter(payment_date__range=[date_from, date_to])
+    if params.get('payment_mode'):
+        receipts = receipts.filter(payment_mode=params['payment_mode'])
+    rows = receipts.order_by('receipt_no').values_list(
+        'receipt_no', 'payment_date', 'student__student_id', 'student__name', 'student__student_class',
+        'payment_mode', 'total_amount', 'remarks',
+    ).iterator(chunk_size=CHUNK_SIZE)
+    header = ['Receipt No', 'Date', 'Student ID', 'Name', 'Class', 'Mode', 'Amount', 'Remarks']
+    return Export(f'receipts-{date_from}-to-{date_to}', header, rows)
+
+
+EXPORTS = {
+    'defaulters': defaulters_export,
+    'daybook': daybook_export,
+    'receipts': receipts_export,
+}
+
+
+def parse_file_type(params):
+    value = (params.get('file_type') or 'csv').lower()
+    if value not in FILE_TYPES:
+        raise ValueError(f"file_type must be one of {', '.join(FILE_TYPES)}")
+    return value
+
+
+def build_export(kind, params):
+    """Raises ValueError for bad parameters before any row is read, so the view can still answer 400."""
+    return EXPORTS[kind](params)
+
+
+class _Echo:
+    """File-like object for csv.writer that hands each line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_chunks(export):
+    writer = csv.writer(_Echo())
+    # The BOM makes Excel read the file as UTF-8
+    yield '\ufeff' + writer.writerow(export.header)
+    lines = []
+    for row in export.rows:
+        lines.append(writer.writerow(row))
+        if len(lines) >= CSV_LINES_PER_CHUNK:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def write_xlsx(export, fh):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(export.name[:31])
+    sheet.append(export.header)
+    for row in export.rows:
+        sheet.append(row)
+    workbook.save(fh)
+
+
+def export_response(export, file_type):
+    filename = f'{export.name}.{file_type}'
+    if file_type == 'xlsx':
+        fh = tempfile.TemporaryFile()
+        write_xlsx(export, fh)
+        fh.seek(0)
+        return FileResponse(fh, as_attachment=True, filename=filename, content_type=FILE_TYPES['xlsx'])
+    response = StreamingHttpResponse(csv_chunks(export), content_type=f"{FILE_TYPES['csv']}; charset=utf-8")
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
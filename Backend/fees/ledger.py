@@ -0,0 +1,88 @@
+"""
+Student ledger: opening balances, fee assignments and payments with a running balance.
+Used by the ledger and print_ledger endpoints.
+"""
+from datetime import datetime
+
+from .models import FeeTransaction
+from .money import from_paise, paise_expr, to_paise
+
+
+def _sort_key(entry):
+    try:
+        inst = int(entry['installment'])
+    except (TypeError, ValueError):
+        inst = 0  # 'All' or other strings come first
+    return (entry['date'], inst)
+
+
+def student_ledger(schedule, student):
+    """
+    Entries for one student in the schedule's session. Apart from the (cached)
+    schedule this is a single query: the student's payments for the session's heads.
+    """
+    # Debits and credits are kept in paise until the running balance is computed
+    entries = []
+    # Debits: Fee assignments - Group as "All" per head
+    today = datetime.now().strftime('%Y-%m-%d')
+    for head in schedule.heads_for(student.student_class, student.has_transport, student.transport_fee_head_id):
+        entries.append({
+            'date': today,
+            'description': f"Fee Assigned: {head.display_name}",
+            'installment': 'All',
+            'debit': head.amounts[student.student_class],
+            'credit': 0,
+        })
+
+    # Credits: Payments (head names come from the schedule, not a per-row fee_head lookup)
+    head_ids = [h.id for h in schedule.heads_for_class(student.student_class)]
+    transactions = (
+        FeeTransaction.objects.filter(student=student, fee_head_id__in=head_ids)
+        .annotate(amount_paise=paise_expr('amount_paid'))
+        .values_list('fee_head_id', 'payment_date', 'installment_number', 'amount_paise')
+        .order_by('payment_date', 'id')
+    )
+    for fee_head_id, payment_date, installment_number, amount_paise in transactions:
+        entries.append({
+            'date': payment_date.strftime('%Y-%m-%d'),
+            'description': f"Payment: {schedule.heads_by_id[fee_head_id].display_name}",
+            'installment': installment_number,
+            'debit': 0,
+            'credit': amount_paise,
+        })
+
+    # Sort by date then installment
+    entries.sort(key=_sort_key)
+
+    # Opening balances carried over from before the ERP always come first
+    opening = []
+    opening_date = student.created_at.strftime('%Y-%m-%d') if student.created_at else today
+    previous_pending = to_paise(student.previous_pending)
+    previous_paid = to_paise(student.previous_paid)
+    if previous_pending:
+        opening.append({
+            'date': opening_date,
+            'description': "Opening Balance: Previous Pending",
+            'installment': 'Opening',
+            'debit': previous_pending,
+            'credit': 0,
+        })
+    if previous_paid:
+        opening.append({
+            'date': opening_date,
+            'description': "Opening Balance: Previous Paid",
+            'installment': 'Opening',
+            'debit': 0,
+            'credit': previous_paid,
+        })
+    entries = opening + entries
+
+    # Calculate running sum
+    running_sum = 0
+    for entry in entries:
+        running_sum += (entry['debit'] - entry['credit'])
+        entry['debit'] = from_paise(entry['debit'])
+        entry['credit'] = from_paise(entry['credit'])
+        entry['balance'] = from_paise(running_sum)
+
+    return entries
@@ -0,0 +1,166 @@
+import io
+import json
+import logging
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+import openpyxl
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from fees.models import Receipt
+from fees.synthetic import clear_school, seed_school
+from school_erp.middleware import QueryRecorder
+from students.models import Student
+
+
+class Rollback(Exception):
+    pass
+
+
+def import_workbook(students):
+    """An .xlsx in the bulk_import layout that re-imports the given students."""
+    wb = openpyxl.Workbook()
+    sheet = wb.active
+    sheet.append(['Student ID', 'Name', 'Class', 'Contact', 'Transport', 'Transport Head', 'Previous Pending', 'Previous Paid'])
+    for s in students:
+        sheet.append([s.student_id, s.name, s.student_class, s.contact_number, 'yes' if s.has_transport else 'no',
+                      s.transport_fee_head.name if s.transport_fee_head else None, float(s.previous_pending), 0])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database at several scales and time the heavy endpoints. "
+        "Writes a JSON report that can be compared with one from another commit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='500,2000,5000', help="Comma-separated student counts")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per endpoint after the first (cold) run")
+        parser.add_argument('--import-rows', type=int, default=500, help="Rows in the bulk_import workbook")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default='benchmark-report.json')
+        parser.add_argument('--compare', help="Earlier report to print a comparison against")
+
+    def handle(self, *args, **options):
+        scales = [int(n) for n in options['scales'].split(',') if n.strip()]
+        # Every auto_match run crosses the slow-request threshold; the report has the numbers
+        logging.getLogger('school_erp.middleware').setLevel(logging.ERROR)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = {}
+            for scale in scales:
+                clear_school()
+                counts = seed_school(scale, seed=options['seed'])
+                self.stdout.write(f"\n{scale} students: {counts['receipts']} receipts, {counts['transactions']} transactions")
+                results[str(scale)] = {'rows': counts, 'endpoints': self.run_scale(options)}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'revision': git_revision(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'scales': results,
+        }
+        with open(options['output'], 'w') as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"\nReport written to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as fh:
+                self.print_comparison(json.load(fh), report)
+
+    def endpoints(self, options):
+        session = '2026-27'
+        receipt = Receipt.objects.select_related('student').order_by('id').first()
+        student = receipt.student
+        workbook = import_workbook(
+            Student.objects.select_related('transport_fee_head').order_by('id')[:options['import_rows']]
+        )
+
+        def bulk_import(client):
+            upload = io.BytesIO(workbook)
+            upload.name = 'students.xlsx'
+            return client.post('/api/students/bulk_import/', {'file': upload}, format='multipart')
+
+        # (name, request, writes data)
+        return [
+            ('pending_fees', lambda c: c.get(f'/api/students/pending_fees/?session={session}'), False),
+            ('stats', lambda c: c.get(f'/api/students/stats/?session={session}'), False),
+            ('ledger', lambda c: c.get(f'/api/students/{student.id}/ledger/?session={session}'), False),
+            ('print_receipt', lambda c: c.get(f'/api/fees/receipts/{receipt.id}/print_receipt/'), False),
+            ('auto_match', lambda c: c.post('/api/fees/reconciliation/auto_match/'), True),
+            ('bulk_import', bulk_import, True),
+        ]
+
+    def run_scale(self, options):
+        client = APIClient()
+        results = {}
+        for name, request, writes in self.endpoints(options):
+            timings, queries, status_code = [], None, None
+            for _ in range(options['repeat'] + 1):
+                recorder = QueryRecorder()
+                with connection.execute_wrapper(recorder):
+                    start = time.perf_counter()
+                    if writes:
+                        # Roll back so every run starts from the same data
+                        try:
+                            with transaction.atomic():
+                                response = request(client)
+                                raise Rollback
+                        except Rollback:
+                            pass
+                    else:
+                        response = request(client)
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries = recorder.count if queries is None else queries
+                status_code = response.status_code
+
+            warm = timings[1:] or timings
+            results[name] = {
+                'status': status_code,
+                'queries': queries,
+                'cold_ms': round(timings[0], 2),
+                'median_ms': round(statistics.median(warm), 2),
+                'min_ms': round(min(warm), 2),
+            }
+            self.stdout.write(
+                f"  {name:<15} {results[name]['median_ms']:>9.1f}ms median  {results[name]['cold_ms']:>9.1f}ms cold  "
+                f"{queries:>5} queries  [{status_code}]"
+            )
+        return results
+
+    def print_comparison(self, before, after):
+        self.stdout.write(f"\nMedian ms, {before.get('revision')} -> {after.get('revision')}")
+        for scale, data in after['scales'].items():
+            old = before.get('scales', {}).get(scale)
+            if not old:
+                continue
+            self.stdout.write(f"{scale} students")
+            for name, metrics in data['endpoints'].items():
+                prev = old['endpoints'].get(name)
+                if not prev:
+                    continue
+                ratio = prev['median_ms'] / metrics['median_ms'] if metrics['median_ms'] else 0
+                self.stdout.write(
+                    f"  {name:<15} {prev['median_ms']:>9.1f} -> {metrics['median_ms']:>9.1f}  ({ratio:.2f}x)  "
+                    f"queries {prev['queries']} -> {metrics['queries']}"
+                )
@@ -0,0 +1,117 @@
+import random
+import time
+from types import MappingProxyType
+
+from django.core.management.base import BaseCommand
+
+from fees.engine import FeeEngine
+from fees.money import split_installments
+from fees.schedule import FeeSchedule, HeadSchedule, TRANSPORT_DISPLAY_NAME
+from students.models import Student
+
+CLASSES = [choice for choice, _ in Student._meta.get_field('student_class').choices]
+
+
+def synthetic_schedule(installments=4, regular_heads=6, transport_heads=4):
+    heads = []
+    for i in range(regular_heads + transport_heads):
+        is_transport = i >= regular_heads
+        inst_count = 1 if i == 0 else installments  # first head is a one-time admission fee
+        amounts = {c: random.randrange(500, 20000, 50) * 100 for c in CLASSES}
+        heads.append(HeadSchedule(
+            id=i + 1,
+            name=f"Head {i + 1}",
+            display_name=TRANSPORT_DISPLAY_NAME if is_transport else f"Head {i + 1}",
+            is_transport_fee=is_transport,
+            frequency='ONCE' if inst_count == 1 else 'INSTALLMENTS',
+            installment_count=inst_count,
+            due_months=(),
+            amounts=MappingProxyType(amounts),
+            installment_amounts=MappingProxyType({c: split_installments(a, inst_count) for c, a in amounts.items()}),
+        ))
+    return FeeSchedule(
+        session='bench',
+        version=0,
+        installment_count=installments,
+        due_months=(),
+        due_day=10,
+        heads=tuple(heads),
+        heads_by_class=MappingProxyType({c: tuple(heads) for c in CLASSES}),
+        heads_by_id=MappingProxyType({h.id: h for h in heads}),
+    )
+
+
+def synthetic_students(schedule, count, opt_out_rate=0.05):
+    transport_ids = [h.id for h in schedule.heads if h.is_transport_fee]
+    students = []
+    for sid in range(1, count + 1):
+        has_transport = random.random() < 0.4
+        students.append({
+            'id': sid,
+            'student_class': random.choice(CLASSES),
+            'has_transport': has_transport,
+            'transport_fee_head_id': random.choice(transport_ids) if has_transport else None,
+        })
+    enroll_map = {}
+    for s in students:
+        if random.random() < opt_out_rate:
+            head = random.choice(schedule.heads)
+            enroll_map[(s['id'], head.id, random.randint(1, head.installment_count))] = False
+    return students, enroll_map
+
+
+def legacy_expected(schedule, students, enroll_map):
+    """The per-student float loop StudentViewSet.stats used before the engine (paise in, paise out)."""
+    total_expected = 0
+    for s in students:
+        for h in schedule.heads:
+            amt = h.amounts.get(s['student_class'])
+            if amt is None: continue
+            if h.is_transport_fee and (not s['has_transport'] or s['transport_fee_head_id'] != h.id):
+                continue
+            inst_count = h.installment_count
+            for i in range(1, inst_count + 1):
+                if enroll_map.get((s['id'], h.id, i), True):
+                    total_expected += (amt / inst_count)
+    return total_expected
+
+
+def engine_expected(schedule, students, enroll_map):
+    engine = FeeEngine(schedule)
+    row_index = {s['id']: r for r, s in enumerate(students)}
+    dues = engine.compute(
+        [s['student_class'] for s in students],
+        [s['has_transport'] for s in students],
+        [s['transport_fee_head_id'] for s in students],
+        opt_outs=((row_index[s_id], h_id, inst, 1) for (s_id, h_id, inst) in enroll_map),
+    )
+    return int(dues.expected().sum())
+
+
+class Command(BaseCommand):
+    help = "Compare the vectorized fee engine with the legacy per-student loop on synthetic data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', default='1000,10000,50000', help="Comma-separated student counts")
+        parser.add_argument('--installments', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        schedule = synthetic_schedule(options['installments'])
+        self.stdout.write(f"{'students':>10} {'legacy (s)':>12} {'engine (s)':>12} {'speedup':>9}  match")
+        for count in [int(n) for n in options['students'].split(',') if n.strip()]:
+            students, enroll_map = synthetic_students(schedule, count)
+
+            start = time.perf_counter()
+            legacy = legacy_expected(schedule, students, enroll_map)
+            legacy_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            vectorized = engine_expected(schedule, students, enroll_map)
+            engine_time = time.perf_counter() - start
+
+            match = abs(legacy - vectorized) < 1
+            self.stdout.write(
+                f"{count:>10} {legacy_time:>12.4f} {engine_time:>12.4f} {legacy_time / engine_time:>8.1f}x  {match}"
+            )
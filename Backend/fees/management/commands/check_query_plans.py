@@ -0,0 +1,102 @@
+import re
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from fees.models import BankStatementEntry, FeeTransaction, Receipt
+
+# EXPLAIN output lines that mean a full table scan
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)(?! USING)\s*$'),
+}
+
+
+def hot_queries():
+    """(name, queryset, tables that must be read through an index) for the filters the API runs most."""
+    sample = FeeTransaction.objects.order_by('-id').first()
+    student_id = sample.student_id if sample else 1
+    fee_head_id = sample.fee_head_id if sample else 1
+    day = sample.payment_date if sample else date.today()
+    amount = sample.amount_paid if sample else 0
+
+    return [
+        (
+            'paid lookup (student, fee head, installment)',
+            FeeTransaction.objects.filter(student_id=student_id, fee_head_id=fee_head_id, installment_number=1),
+            ['fees_feetransaction'],
+        ),
+        (
+            'collections by payment date range',
+            FeeTransaction.objects.filter(payment_date__range=[day - timedelta(days=7), day]),
+            ['fees_feetransaction'],
+        ),
+        (
+            'student ledger',
+            FeeTransaction.objects.filter(student_id=student_id).order_by('payment_date', 'id'),
+            ['fees_feetransaction'],
+        ),
+        (
+            'student receipts',
+            Receipt.objects.filter(student_id=student_id).order_by('-payment_date'),
+            ['fees_receipt'],
+        ),
+        (
+            'auto_match candidates',
+            FeeTransaction.objects.filter(
+                receipt__payment_mode='ONLINE',
+                amount_paid=amount,
+                payment_date__range=[day - timedelta(days=3), day + timedelta(days=3)],
+                bank_matches__isnull=True,
+            ),
+            ['fees_feetransaction', 'fees_bankstatemententry'],
+        ),
+        (
+            'pending_erp_transactions',
+            FeeTransaction.objects.filter(receipt__payment_mode='ONLINE', bank_matches__isnull=True),
+            ['fees_receipt', 'fees_bankstatemententry'],
+        ),
+        (
+            'unreconciled bank entries',
+            BankStatementEntry.objects.filter(is_reconciled=False).order_by('-date'),
+            ['fees_bankstatemententry'],
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot fee queries and fail if any of them falls back to a sequential scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help="Print the full plan for every query")
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"Query plan checks are not supported on {connection.vendor}")
+
+        failures = []
+        for name, queryset, tables in hot_queries():
+            plan = self.explain(queryset)
+            scanned = {m.group(1) for line in plan.splitlines() if (m := pattern.search(line))}
+            bad = sorted(scanned & set(tables))
+            if options['verbose_plans']:
+                self.stdout.write(f"-- {name}\n{plan}\n")
+            if bad:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"SEQ SCAN  {name}: {', '.join(bad)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok        {name}"))
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot queries use a sequential scan")
+
+    def explain(self, queryset):
+        if connection.vendor != 'postgresql':
+            return queryset.explain()
+        # Small tables are cheaper to scan, so ask the planner whether an index is usable at all
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
@@ -0,0 +1,139 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from fees.models import Receipt, ReceiptCounter
+from fees.numbering import RECEIPT_SERIES, allocate_receipt_numbers, next_receipt_number
+from students.models import Student
+
+
+class Rollback(Exception):
+    pass
+
+
+def run_threads(count, target):
+    errors = []
+
+    def worker(n):
+        try:
+            target(n)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            # Each thread has its own connection
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise CommandError(f"{len(errors)} worker(s) failed, first error: {errors[0]!r}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Allocate receipt numbers from many threads at once in a throwaway test database "
+        "and check that they are unique and gap-free, with no worker hitting the unique constraint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--receipts', type=int, default=50, help="Receipts posted by each thread")
+
+    def handle(self, *args, **options):
+        threads, receipts = options['threads'], options['receipts']
+        test_settings = connection.settings_dict['TEST']
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            # Threads cannot share SQLite's in-memory test database: its tables lock instead of waiting
+            test_settings['NAME'] = os.path.join(tempfile.gettempdir(), 'check_receipt_numbering.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.student = Student.objects.create(name='Numbering Check', student_id='NUM000001', student_class='Class 1')
+            checks = [
+                self.check_single_receipts(threads, receipts),
+                self.check_blocks(threads, receipts),
+                self.check_rollbacks(threads, receipts),
+            ]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, expected, actual, elapsed in checks:
+            ok = expected == actual
+            line = f"{name:<34} expected {str(expected):>16}  got {str(actual):>16}  {elapsed:>6.2f}s"
+            self.stdout.write(self.style.SUCCESS(line) if ok else self.style.ERROR(line))
+        if any(expected != actual for _, expected, actual, _ in checks):
+            raise CommandError("Receipt numbers are not unique and gap-free")
+
+    def create_receipt(self, receipt_no):
+        Receipt.objects.create(receipt_no=receipt_no, student=self.student, total_amount=100)
+
+    def numbering(self, first):
+        """(first number, receipt count, distinct numbers, last number) of the receipts from `first` on."""
+        numbers = list(Receipt.objects.filter(receipt_no__gte=first).values_list('receipt_no', flat=True))
+        return first, len(numbers), len(set(numbers)), max(numbers, default=first - 1)
+
+    def check_single_receipts(self, threads, receipts):
+        """Every thread posts receipts one at a time like ReceiptViewSet.create; the counter row starts missing."""
+        ReceiptCounter.objects.filter(series=RECEIPT_SERIES).delete()
+        first = (Receipt.objects.order_by('-receipt_no').values_list('receipt_no', flat=True).first() or 0) + 1
+
+        def post(n):
+            for _ in range(receipts):
+                with transaction.atomic():
+                    self.create_receipt(next_receipt_number())
+
+        start = time.perf_counter()
+        run_threads(threads, post)
+        elapsed = time.perf_counter() - start
+        total = threads * receipts
+        return 'single receipts, lazy counter', (first, total, total, first + total - 1), self.numbering(first), elapsed
+
+    def check_blocks(self, threads, receipts):
+        """Every thread reserves blocks of 1 to 5 numbers like post_receipts and creates them in bulk."""
+        first = next_receipt_number()
+        self.create_receipt(first)
+        sizes = [1 + i % 5 for i in range(receipts)]
+
+        def post(n):
+            for size in sizes:
+                with transaction.atomic():
+                    Receipt.objects.bulk_create([
+                        Receipt(receipt_no=receipt_no, student=self.student, total_amount=100)
+                        for receipt_no in allocate_receipt_numbers(size)
+                    ])
+
+        start = time.perf_counter()
+        run_threads(threads, post)
+        elapsed = time.perf_counter() - start
+        total = 1 + threads * sum(sizes)
+        return 'blocks of numbers', (first, total, total, first + total - 1), self.numbering(first), elapsed
+
+    def check_rollbacks(self, threads, receipts):
+        """Every other receipt is rolled back after taking its number, which must be handed back."""
+        first = next_receipt_number()
+        self.create_receipt(first)
+
+        def post(n):
+            for i in range(receipts):
+                try:
+                    with transaction.atomic():
+                        self.create_receipt(next_receipt_number())
+                        if (n + i) % 2:
+                            raise Rollback()
+                except Rollback:
+                    pass
+
+        start = time.perf_counter()
+        run_threads(threads, post)
+        elapsed = time.perf_counter() - start
+        total = 1 + sum(1 for n in range(threads) for i in range(receipts) if not (n + i) % 2)
+        return 'rolled back receipts', (first, total, total, first + total - 1), self.numbering(first), elapsed
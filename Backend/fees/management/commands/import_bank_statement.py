@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fees.reconciliation import import_statement
+
+
+class Command(BaseCommand):
+    help = "Import a CSV bank statement. Lines that were already imported are skipped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as fh:
+                result = import_statement(fh, encoding=options['encoding'])
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(f"Columns: {result['columns']}, date format {result['date_format']}")
+        for reject in result['rejects'][:20]:
+            self.stdout.write(f"  Row {reject['row']}: {reject['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['created']}, already imported {result['duplicates']}, "
+            f"rejected {result['rejected']} in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from fees.aggregates import expected_daily_collections
+from fees.models import DailyCollectionSummary
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyCollectionSummary table from FeeTransaction rows and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report drift, do not rewrite the table")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expected = expected_daily_collections()
+
+        current = {}
+        stored = DailyCollectionSummary.objects.values_list(
+            'date', 'session', 'student_class', 'fee_head_id', 'installment_number', 'payment_mode',
+            'amount', 'transaction_count'
+        )
+        for *key, amount, count in stored.iterator(chunk_size=options['batch_size']):
+            current[tuple(key)] = (amount, count)
+
+        missing = [k for k in expected if k not in current]
+        extra = [k for k in current if k not in expected]
+        mismatched = [k for k in expected if k in current and expected[k] != current[k]]
+
+        self.stdout.write(f"Expected keys: {len(expected)}, stored keys: {len(current)}")
+        self.stdout.write(f"Missing: {len(missing)}, extra: {len(extra)}, mismatched: {len(mismatched)}")
+        for key in (missing + extra + mismatched)[:20]:
+            self.stdout.write(f"  {key}: stored={current.get(key)} expected={expected.get(key)}")
+
+        drift = bool(missing or extra or mismatched)
+        if options['check']:
+            if drift:
+                self.stdout.write(self.style.WARNING("Drift detected. Run without --check to rebuild."))
+            else:
+                self.stdout.write(self.style.SUCCESS("No drift."))
+            return
+
+        with transaction.atomic():
+            DailyCollectionSummary.objects.all().delete()
+            DailyCollectionSummary.objects.bulk_create(
+                [
+                    DailyCollectionSummary(
+                        date=day,
+                        session=session,
+                        student_class=student_class,
+                        fee_head_id=h_id,
+                        installment_number=inst,
+                        payment_mode=mode,
+                        amount=amount,
+                        transaction_count=count,
+                    )
+                    for (day, session, student_class, h_id, inst, mode), (amount, count) in expected.items()
+                ],
+                batch_size=options['batch_size'],
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(expected)} daily collection rows."))
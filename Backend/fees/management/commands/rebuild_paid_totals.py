@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+
+from fees.models import FeeTransaction, StudentFeePaidTotal
+
+
+class Command(BaseCommand):
+    help = "Rebuild the StudentFeePaidTotal table from FeeTransaction rows and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report drift, do not rewrite the table")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expected = {}
+        grouped = (
+            FeeTransaction.objects.filter(fee_head__isnull=False)
+            .values('student_id', 'fee_head_id', 'installment_number')
+            .annotate(amount=Sum('amount_paid'), count=Count('id'), last=Max('payment_date'))
+            .order_by()
+        )
+        for row in grouped.iterator(chunk_size=options['batch_size']):
+            key = (row['student_id'], row['fee_head_id'], row['installment_number'])
+            expected[key] = (row['amount'].quantize(Decimal('0.01')), row['count'], row['last'])
+
+        current = {}
+        stored = StudentFeePaidTotal.objects.values_list(
+            'student_id', 'fee_head_id', 'installment_number', 'amount_paid', 'payment_count', 'last_payment_date'
+        )
+        for s_id, h_id, inst, amount, count, last in stored.iterator(chunk_size=options['batch_size']):
+            current[(s_id, h_id, inst)] = (amount, count, last)
+
+        missing = [k for k in expected if k not in current]
+        extra = [k for k in current if k not in expected]
+        mismatched = [k for k in expected if k in current and expected[k] != current[k]]
+
+        self.stdout.write(f"Expected keys: {len(expected)}, stored keys: {len(current)}")
+        self.stdout.write(f"Missing: {len(missing)}, extra: {len(extra)}, mismatched: {len(mismatched)}")
+        for key in mismatched[:20]:
+            self.stdout.write(f"  {key}: stored={current[key]} expected={expected[key]}")
+
+        drift = bool(missing or extra or mismatched)
+        if options['check']:
+            if drift:
+                self.stdout.write(self.style.WARNING("Drift detected. Run without --check to rebuild."))
+            else:
+                self.stdout.write(self.style.SUCCESS("No drift."))
+            return
+
+        with transaction.atomic():
+            StudentFeePaidTotal.objects.all().delete()
+            StudentFeePaidTotal.objects.bulk_create(
+                [
+                    StudentFeePaidTotal(
+                        student_id=s_id,
+                        fee_head_id=h_id,
+                        installment_number=inst,
+                        amount_paid=amount,
+                        payment_count=count,
+                        last_payment_date=last,
+                    )
+                    for (s_id, h_id, inst), (amount, count, last) in expected.items()
+                ],
+                batch_size=options['batch_size'],
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(expected)} paid total rows."))
@@ -0,0 +1,49 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fees.rollover import rollover_session
+
+
+class Command(BaseCommand):
+    help = (
+        "Start a new academic session: clone the fee setup, promote active students "
+        "and carry unpaid balances into previous_pending."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('from_session', help="Session to roll over, e.g. 2025-26")
+        parser.add_argument('to_session', help="New session, e.g. 2026-27")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without writing anything")
+        parser.add_argument('--show', type=int, default=20, help="Student changes to list")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            report = rollover_session(options['from_session'], options['to_session'], dry_run=options['dry_run'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+
+        fee_setup = report['fee_setup']
+        self.stdout.write(
+            f"Fee setup: global setting {'yes' if fee_setup['global_setting'] else 'no'}, "
+            f"{fee_setup['fee_heads']} heads, {fee_setup['fee_amounts']} class amounts"
+        )
+        for name, value in report['students'].items():
+            self.stdout.write(f"{name:>16}: {value}")
+
+        moves = Counter((c['from_class'], c['to_class']) for c in report['changes'] if c['from_class'] != c['to_class'])
+        for (old, new), count in sorted(moves.items()):
+            self.stdout.write(f"  {old} -> {new}: {count}")
+        for change in report['changes'][:options['show']]:
+            self.stdout.write(
+                f"  {change['student_id']} {change['name']}: {change['from_class']} -> {change['to_class']}, "
+                f"previous_pending {change['previous_pending']} -> {change['new_previous_pending']}"
+            )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"Dry run, nothing written ({elapsed:.1f}s)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rolled {report['from_session']} over to {report['to_session']} in {elapsed:.1f}s."))
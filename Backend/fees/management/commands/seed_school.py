@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fees.models import FeeHead
+from fees.synthetic import clear_school, seed_school
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic school (students, fee heads, receipts, bank statement) with bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--sessions', default='2025-26,2026-27', help="Comma-separated sessions; the last one gets payments")
+        parser.add_argument('--installments', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--reset', action='store_true', help="Delete all existing students and fee data first")
+
+    def handle(self, *args, **options):
+        sessions = [s.strip() for s in options['sessions'].split(',') if s.strip()]
+        if options['reset']:
+            clear_school()
+        elif Student.objects.filter(student_id__startswith='SYN').exists() or FeeHead.objects.filter(session__in=sessions).exists():
+            raise CommandError("Synthetic data or fee heads for these sessions already exist. Use --reset to replace them.")
+
+        start = time.perf_counter()
+        counts = seed_school(options['students'], sessions, options['installments'], options['seed'])
+        elapsed = time.perf_counter() - start
+
+        for name, count in counts.items():
+            self.stdout.write(f"{name:>14}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"Seeded in {elapsed:.1f}s"))
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def backfill_paid_totals(apps, schema_editor):
+    FeeTransaction = apps.get_model('fees', 'FeeTransaction')
+    StudentFeePaidTotal = apps.get_model('fees', 'StudentFeePaidTotal')
+    grouped = (
+        FeeTransaction.objects.filter(fee_head__isnull=False)
+        .values('student_id', 'fee_head_id', 'installment_number')
+        .annotate(amount=Sum('amount_paid'), count=Count('id'), last=Max('payment_date'))
+        .order_by()
+    )
+    StudentFeePaidTotal.objects.bulk_create(
+        [
+            StudentFeePaidTotal(
+                student_id=row['student_id'],
+                fee_head_id=row['fee_head_id'],
+                installment_number=row['installment_number'],
+                amount_paid=row['amount'],
+                payment_count=row['count'],
+                last_payment_date=row['last'],
+            )
+            for row in grouped
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fees', '0015_bankstatemententry_reconciliation_date'),
+        ('students', '0007_student_previous_paid_student_previous_pending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentFeePaidTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('installment_number', models.IntegerField()),
+                ('amount_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('last_payment_date', models.DateField(blank=True, null=True)),
+                ('fee_head', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paid_totals', to='fees.feehead')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paid_totals', to='students.student')),
+            ],
+            options={
+                'unique_together': {('student', 'fee_head', 'installment_number')},
+            },
+        ),
+        migrations.RunPython(backfill_paid_totals, migrations.RunPython.noop),
+    ]
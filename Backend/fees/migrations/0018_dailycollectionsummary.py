@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_daily_collections(apps, schema_editor):
+    FeeTransaction = apps.get_model('fees', 'FeeTransaction')
+    DailyCollectionSummary = apps.get_model('fees', 'DailyCollectionSummary')
+    grouped = (
+        FeeTransaction.objects.filter(fee_head__isnull=False)
+        .values('payment_date', 'fee_head__session', 'student__student_class', 'fee_head_id',
+                'installment_number', 'receipt__payment_mode')
+        .annotate(amount=Sum('amount_paid'), count=Count('id'))
+        .order_by()
+    )
+    DailyCollectionSummary.objects.bulk_create(
+        [
+            DailyCollectionSummary(
+                date=row['payment_date'],
+                session=row['fee_head__session'],
+                student_class=row['student__student_class'],
+                fee_head_id=row['fee_head_id'],
+                installment_number=row['installment_number'],
+                payment_mode=row['receipt__payment_mode'] or '',
+                amount=row['amount'],
+                transaction_count=row['count'],
+            )
+            for row in grouped
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fees', '0017_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCollectionSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('session', models.CharField(max_length=10)),
+                ('student_class', models.CharField(max_length=20)),
+                ('installment_number', models.IntegerField()),
+                ('payment_mode', models.CharField(blank=True, help_text='Receipt payment mode, blank if no receipt', max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('fee_head', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_collections', to='fees.feehead')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['session', 'date'], name='fees_dailyc_session_a519f8_idx')],
+                'unique_together': {('date', 'session', 'student_class', 'fee_head', 'installment_number', 'payment_mode')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_collections, migrations.RunPython.noop),
+    ]
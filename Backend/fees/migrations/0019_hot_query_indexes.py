@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fees', '0018_dailycollectionsummary'),
+        ('students', '0007_student_previous_paid_student_previous_pending'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bankstatemententry',
+            index=models.Index(condition=models.Q(('is_reconciled', False)), fields=['-date'], name='bank_entry_unreconciled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bankstatemententry',
+            index=models.Index(fields=['date'], name='bank_entry_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feetransaction',
+            index=models.Index(fields=['student', 'fee_head', 'installment_number'], name='feetx_student_head_inst_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feetransaction',
+            index=models.Index(fields=['payment_date'], name='feetx_payment_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feetransaction',
+            index=models.Index(fields=['amount_paid', 'payment_date'], name='feetx_amount_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receipt',
+            index=models.Index(fields=['student', 'payment_date'], name='receipt_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receipt',
+            index=models.Index(condition=models.Q(('payment_mode', 'ONLINE')), fields=['id'], name='receipt_online_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:22
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def create_receipt_counter(apps, schema_editor):
+    Receipt = apps.get_model('fees', 'Receipt')
+    ReceiptCounter = apps.get_model('fees', 'ReceiptCounter')
+    last = Receipt.objects.aggregate(Max('receipt_no'))['receipt_no__max'] or 0
+    ReceiptCounter.objects.create(series='receipt', next_value=last + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fees', '0019_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceiptCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('series', models.CharField(max_length=20, unique=True)),
+                ('next_value', models.PositiveBigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(create_receipt_counter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:45
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_entries(apps, schema_editor):
+    """
+    Fingerprint existing entries the way fees/reconciliation.py does, so re-uploads are skipped.
+    Entries do not record whether they were uploaded or created by hand, and nearly all come from
+    uploads, so every entry is hashed. An upload of a line that matches a hand-made entry from
+    before this migration is therefore skipped as a duplicate.
+    """
+    BankStatementEntry = apps.get_model('fees', 'BankStatementEntry')
+    seen = {}
+    batch = []
+    for entry in BankStatementEntry.objects.order_by('id').iterator(chunk_size=2000):
+        paise = int((entry.amount * 100).quantize(1))
+        description = ' '.join((entry.description or '').split())
+        ref_number = (entry.ref_number or '').strip()
+        key = (entry.date, paise, description, ref_number)
+        ordinal = seen[key] = seen.get(key, 0) + 1
+        normalized = '|'.join([entry.date.isoformat(), str(paise), description, ref_number, str(ordinal)])
+        entry.content_hash = hashlib.sha256(normalized.encode()).hexdigest()
+        batch.append(entry)
+        if len(batch) >= 2000:
+            BankStatementEntry.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    if batch:
+        BankStatementEntry.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fees', '0020_receiptcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bankstatemententry',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(hash_existing_entries, migrations.RunPython.noop),
+    ]
@@ -107,7 +107,14 @@ class Receipt(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     remarks = models.TextField(blank=True)
     payment_mode = models.CharField(max_length=10, choices=[('CASH', 'Cash'), ('ONLINE', 'Online')], default='CASH')
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'payment_date'], name='receipt_student_date_idx'),
+            # Bank reconciliation only ever looks at online receipts
+            models.Index(fields=['id'], condition=models.Q(payment_mode='ONLINE'), name='receipt_online_idx'),
+        ]
+
     def __str__(self):
         return f"Receipt #{self.receipt_no} - {self.student.name}"
 
@@ -119,10 +126,65 @@ class FeeTransaction(models.Model):
     installment_number = models.IntegerField(default=1)
     payment_date = models.DateField(auto_now_add=True)
     remarks = models.TextField(blank=True)
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'fee_head', 'installment_number'], name='feetx_student_head_inst_idx'),
+            models.Index(fields=['payment_date'], name='feetx_payment_date_idx'),
+            # Bank auto-match looks up an exact amount within a few days
+            models.Index(fields=['amount_paid', 'payment_date'], name='feetx_amount_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.student.name} - {self.fee_head.name if self.fee_head else 'General'} - {self.amount_paid}"
 
+class StudentFeePaidTotal(models.Model):
+    """
+    Running total of payments per (student, fee head, installment).
+    Maintained alongside FeeTransaction writes (see fees/aggregates.py) so
+    pending-fee reports read one compact row per key instead of every payment.
+    Rebuild with: python manage.py rebuild_paid_totals
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='paid_totals')
+    fee_head = models.ForeignKey(FeeHead, on_delete=models.CASCADE, related_name='paid_totals')
+    installment_number = models.IntegerField()
+    amount_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payment_count = models.IntegerField(default=0)
+    last_payment_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['student', 'fee_head', 'installment_number']
+
+    def __str__(self):
+        return f"{self.student_id} - {self.fee_head_id} - Inst {self.installment_number} - {self.amount_paid}"
+
+class DailyCollectionSummary(models.Model):
+    """
+    Collections rolled up per day, session, class, fee head, installment and
+    payment mode. Maintained alongside FeeTransaction writes (see
+    fees/aggregates.py) so date-range totals sum a few small rows instead of
+    every payment. student_class is the student's current class, matching
+    what the raw transaction filters report.
+    Rebuild or check with: python manage.py rebuild_daily_collections
+    """
+    date = models.DateField()
+    session = models.CharField(max_length=10)
+    student_class = models.CharField(max_length=20)
+    fee_head = models.ForeignKey(FeeHead, on_delete=models.CASCADE, related_name='daily_collections')
+    installment_number = models.IntegerField()
+    payment_mode = models.CharField(max_length=10, blank=True, help_text="Receipt payment mode, blank if no receipt")
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['date', 'session', 'student_class', 'fee_head', 'installment_number', 'payment_mode']
+        indexes = [
+            models.Index(fields=['session', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.student_class} - {self.fee_head_id} - Inst {self.installment_number} - {self.amount}"
+
 class StudentFeeEnrollment(models.Model):
     """
     Tracks per-installment enrollment for any fee head.
@@ -150,6 +212,31 @@ class StudentFeeEnrollment(models.Model):
     def __str__(self):
         status = "Enrolled" if self.is_enrolled else "Opted Out"
         return f"{self.student.name} - {self.fee_head.name} - Inst {self.installment_number} - {status}"
+
+class DataVersion(models.Model):
+    """
+    Change counters for derived data that is cached in-process.
+    Bumping a key makes every worker drop what it built from the old version.
+    See fees/versions.py.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+class ReceiptCounter(models.Model):
+    """
+    Next free receipt number per series, handed out under a row lock.
+    See fees/numbering.py.
+    """
+    series = models.CharField(max_length=20, unique=True)
+    next_value = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.series}: next {self.next_value}"
+
 class BankStatementEntry(models.Model):
     date = models.DateField()
     description = models.TextField()
@@ -158,8 +245,18 @@ class BankStatementEntry(models.Model):
     is_reconciled = models.BooleanField(default=False)
     reconciliation_date = models.DateField(null=True, blank=True)
     matched_transaction = models.ForeignKey(FeeTransaction, on_delete=models.SET_NULL, null=True, blank=True, related_name='bank_matches')
+    # Fingerprint of an uploaded statement line so re-uploads are skipped (see fees/reconciliation.py).
+    # Blank for entries created by hand, except those from before migration 0021, which hashed every
+    # existing entry because it cannot tell them from uploaded ones.
+    content_hash = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date'], condition=models.Q(is_reconciled=False), name='bank_entry_unreconciled_idx'),
+            models.Index(fields=['date'], name='bank_entry_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.date} - {self.amount} - {self.description[:30]}"
@@ -0,0 +1,48 @@
+"""
+Money as integer paise.
+
+Fee calculations keep amounts in paise (1 rupee = 100 paise) so totals are
+exact and the per-student loops do plain integer arithmetic. Values are
+converted once at the edges: from the database with paise_expr() and back to
+rupees with from_paise() when building a response.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import BigIntegerField, F
+from django.db.models.functions import Cast, Round
+
+PAISE_PER_RUPEE = 100
+
+
+def to_paise(value):
+    """Rupees (Decimal, str, int or float) -> int paise, rounding half up."""
+    if value is None:
+        return 0
+    rupees = Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    return int(rupees * PAISE_PER_RUPEE)
+
+
+def from_paise(paise):
+    """int paise -> rupees as a float, the number type the API has always emitted."""
+    return int(paise) / PAISE_PER_RUPEE
+
+
+def paise_to_decimal(paise):
+    """int paise -> Decimal rupees for DecimalField storage."""
+    return Decimal(int(paise)) / PAISE_PER_RUPEE
+
+
+def split_installments(total_paise, count):
+    """
+    Split a total into `count` installments of whole paise.
+    Every installment gets the floor share and the remainder goes to the last,
+    so the parts always add back up to the total.
+    """
+    count = max(int(count), 1)
+    share = total_paise // count
+    return (share,) * (count - 1) + (total_paise - share * (count - 1),)
+
+
+def paise_expr(field):
+    """SQL expression converting a DecimalField in rupees to integer paise."""
+    return Cast(Round(F(field) * PAISE_PER_RUPEE), output_field=BigIntegerField())
@@ -0,0 +1,49 @@
+"""
+Receipt number allocation.
+
+Numbers come from a ReceiptCounter row that is incremented with
+UPDATE ... SET next_value = next_value + n before it is read. The UPDATE
+takes the row lock (the write lock on SQLite, which has no row locks), so
+concurrent cashiers queue on one row for the rest of their transaction
+instead of racing on Max('receipt_no') + 1 and hitting the unique
+constraint. Allocation is O(1) and a block of numbers can be reserved
+in one step for batch posting.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+
+from .models import Receipt, ReceiptCounter
+
+# Receipt.receipt_no is unique across the whole table, so every receipt uses one series.
+# Other series (e.g. a per-session prefix) need their own number column.
+RECEIPT_SERIES = 'receipt'
+
+
+def _create_counter(series):
+    start = (Receipt.objects.aggregate(Max('receipt_no'))['receipt_no__max'] or 0) + 1
+    try:
+        with transaction.atomic():
+            ReceiptCounter.objects.create(series=series, next_value=start)
+    except IntegrityError:
+        # Another request created it first
+        pass
+
+
+def allocate_receipt_numbers(count=1, series=RECEIPT_SERIES):
+    """
+    Reserve `count` consecutive receipt numbers and return them as a range.
+    Call inside the transaction that creates the receipts: the counter row stays
+    locked until it commits, and a rollback hands the numbers back.
+    """
+    counter = ReceiptCounter.objects.filter(series=series)
+    with transaction.atomic():
+        # Write before reading: a read lock taken first could not be upgraded on SQLite
+        if not counter.update(next_value=F('next_value') + count):
+            _create_counter(series)
+            counter.update(next_value=F('next_value') + count)
+        end = counter.values_list('next_value', flat=True).get()
+    return range(end - count, end)
+
+
+def next_receipt_number(series=RECEIPT_SERIES):
+    return allocate_receipt_numbers(1, series)[0]
@@ -0,0 +1,74 @@
+"""
+Per-student pending fee breakdown built on the vectorized fee engine.
+Used by the pending_fees endpoint (defaulters list and the fee counter).
+"""
+import numpy as np
+
+from .engine import get_fee_engine
+from .money import from_paise
+
+
+def pending_fee_details(schedule, students, paid_rows, opt_out_rows, show_all=False):
+    """
+    students: dicts with id, student_id, name, student_class, has_transport, transport_fee_head_id
+    paid_rows: (student_id, fee_head_id, installment_number, paise paid) totals
+    opt_out_rows: (student_id, fee_head_id, installment_number) keys the student opted out of
+
+    Returns one entry per student with dues outstanding (or every student with show_all).
+    """
+    if not students:
+        return []
+
+    engine = get_fee_engine(schedule)
+    row_index = {s['id']: r for r, s in enumerate(students)}
+    dues = engine.compute(
+        [s['student_class'] for s in students],
+        [s['has_transport'] for s in students],
+        [s['transport_fee_head_id'] for s in students],
+        opt_outs=((row_index[s_id], h_id, inst, 1) for s_id, h_id, inst in opt_out_rows if s_id in row_index),
+    )
+
+    # Heads with a zero amount are not listed at all
+    listed = (dues.enrolled > 0) & (dues.amounts != 0)[:, :, None]
+    due = np.where(listed, dues.due_tensor(), 0)
+    paid = np.where(listed, dues.paid_tensor(row_index, paid_rows), 0)
+    total_expected = due.sum(axis=(1, 2)).tolist()
+    total_paid = paid.sum(axis=(1, 2)).tolist()
+    display_names = [h.display_name for h in schedule.heads]
+
+    details = []
+    for r, student in enumerate(students):
+        balance = total_expected[r] - total_paid[r]
+        if not (show_all or balance > 0):
+            continue
+
+        installment_data = {i: {'heads': {}} for i in range(1, schedule.installment_count + 1)}
+        head_idx, inst_idx = np.nonzero(listed[r])
+        due_r = due[r][head_idx, inst_idx].tolist()
+        paid_r = paid[r][head_idx, inst_idx].tolist()
+        entries = []
+        for h, i, inst_amt, paid_amt in zip(head_idx.tolist(), inst_idx.tolist(), due_r, paid_r):
+            heads = installment_data.setdefault(i + 1, {'heads': {}})['heads']
+            entry = heads.get(display_names[h])
+            if entry is None:
+                entry = heads[display_names[h]] = {'due': 0, 'paid': 0, 'pending': 0}
+                entries.append(entry)
+            entry['due'] += inst_amt
+            entry['paid'] += paid_amt
+            entry['pending'] += (inst_amt - paid_amt)
+        for entry in entries:
+            entry['due'] = from_paise(entry['due'])
+            entry['paid'] = from_paise(entry['paid'])
+            entry['pending'] = from_paise(entry['pending'])
+
+        details.append({
+            'id': student['id'],
+            'student_id': student['student_id'],
+            'name': student['name'],
+            'student_class': student['student_class'],
+            'total_due': from_paise(total_expected[r]),
+            'total_paid': from_paise(total_paid[r]),
+            'pending_amount': from_paise(balance),
+            'installment_data': installment_data
+        })
+    return details
@@ -0,0 +1,163 @@
+"""
+Batch receipt posting for fee-collection days.
+
+post_receipts() validates every receipt up front with a couple of lookup
+queries, reserves a block of receipt numbers and inserts all Receipt and
+FeeTransaction rows with bulk_create in one transaction. bulk_create skips
+model signals, so the aggregates are updated and the data versions bumped
+here explicitly.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from students.models import Student
+from .aggregates import record_payments
+from .models import FeeHead, FeeTransaction, Receipt
+from .money import paise_to_decimal, to_paise
+from .numbering import allocate_receipt_numbers
+from .versions import FEE_DATA, bump_versions_on_commit, student_ledger_key
+
+PAYMENT_MODES = {choice for choice, _ in Receipt._meta.get_field('payment_mode').choices}
+
+
+def _validate(entry, student_ids, head_ids):
+    """Return (cleaned receipt, errors) for one receipt of the batch."""
+    errors = []
+    if not isinstance(entry, dict):
+        return None, ['Receipt must be an object']
+
+    student_id = entry.get('student')
+    if student_id not in student_ids:
+        errors.append(f'Unknown student: {student_id}')
+
+    payment_mode = entry.get('payment_mode', 'CASH')
+    if payment_mode not in PAYMENT_MODES:
+        errors.append(f'Invalid payment_mode: {payment_mode}')
+
+    payment_date = entry.get('payment_date')
+    if payment_date:
+        try:
+            payment_date = parse_date(str(payment_date))
+        except ValueError:
+            payment_date = None
+        if payment_date is None:
+            errors.append(f"Invalid payment_date: {entry.get('payment_date')}")
+
+    items = entry.get('items')
+    if not items or not isinstance(items, list):
+        errors.append('At least one item is required')
+        items = []
+
+    cleaned_items = []
+    for n, item in enumerate(items, start=1):
+        try:
+            fee_head_id = int(item['fee_head'])
+            amount = Decimal(str(item['amount_paid']))
+            installment_number = int(item.get('installment_number', 1))
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            errors.append(f'Item {n}: fee_head, amount_paid and installment_number are required')
+            continue
+        if fee_head_id not in head_ids:
+            errors.append(f'Item {n}: unknown fee head {fee_head_id}')
+        if to_paise(amount) <= 0:
+            errors.append(f'Item {n}: amount_paid must be positive')
+        if installment_number < 1:
+            errors.append(f'Item {n}: installment_number must be at least 1')
+        cleaned_items.append((fee_head_id, paise_to_decimal(to_paise(amount)), installment_number))
+
+    if errors:
+        return None, errors
+    return {
+        'student_id': student_id,
+        'items': cleaned_items,
+        'remarks': entry.get('remarks', ''),
+        'payment_mode': payment_mode,
+        'payment_date': payment_date,
+    }, []
+
+
+def _normalize_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def post_receipts(entries):
+    """
+    Validate and post a batch of receipts shaped like ReceiptViewSet.create's body:
+        {"student": 1, "items": [{"fee_head": 2, "amount_paid": "500", "installment_number": 1}],
+         "payment_mode": "CASH", "remarks": "", "payment_date": "2026-04-10"}
+    Invalid receipts are reported and skipped; the valid ones are posted together.
+    Returns one result dict per entry, in order.
+    """
+    for entry in entries:
+        if isinstance(entry, dict):
+            entry['student'] = _normalize_id(entry.get('student'))
+    student_ids = set(Student.objects.filter(
+        id__in=[e['student'] for e in entries if isinstance(e, dict) and isinstance(e['student'], int)]
+    ).values_list('id', flat=True))
+    head_ids = set(FeeHead.objects.values_list('id', flat=True))
+
+    results, valid = [], []
+    for index, entry in enumerate(entries):
+        cleaned, errors = _validate(entry, student_ids, head_ids)
+        if errors:
+            results.append({'index': index, 'status': 'failed', 'errors': errors})
+        else:
+            results.append(None)
+            valid.append((index, cleaned))
+
+    if not valid:
+        return results
+
+    with transaction.atomic():
+        receipts = [
+            Receipt(
+                receipt_no=receipt_no,
+                student_id=cleaned['student_id'],
+                total_amount=sum((amount for _, amount, _ in cleaned['items']), Decimal('0')),
+                remarks=cleaned['remarks'],
+                payment_mode=cleaned['payment_mode'],
+            )
+            for (_, cleaned), receipt_no in zip(valid, allocate_receipt_numbers(len(valid)))
+        ]
+        Receipt.objects.bulk_create(receipts, batch_size=1000)
+
+        # payment_date is auto_now_add; custom dates are applied to the receipt like ReceiptViewSet.create
+        by_date = {}
+        for receipt, (_, cleaned) in zip(receipts, valid):
+            if cleaned['payment_date']:
+                receipt.payment_date = cleaned['payment_date']
+                by_date.setdefault(cleaned['payment_date'], []).append(receipt.id)
+        for payment_date, ids in by_date.items():
+            Receipt.objects.filter(id__in=ids).update(payment_date=payment_date)
+
+        transactions = [
+            FeeTransaction(
+                student_id=receipt.student_id,
+                fee_head_id=fee_head_id,
+                receipt=receipt,
+                amount_paid=amount,
+                installment_number=installment_number,
+                remarks=cleaned['remarks'],
+            )
+            for receipt, (_, cleaned) in zip(receipts, valid)
+            for fee_head_id, amount, installment_number in cleaned['items']
+        ]
+        FeeTransaction.objects.bulk_create(transactions, batch_size=2000)
+        record_payments(transactions)
+
+        bump_versions_on_commit([FEE_DATA] + [student_ledger_key(s_id) for s_id in {r.student_id for r in receipts}])
+
+    for receipt, (index, _) in zip(receipts, valid):
+        results[index] = {
+            'index': index,
+            'status': 'created',
+            'id': receipt.id,
+            'receipt_no': receipt.receipt_no,
+            'total_amount': float(receipt.total_amount),
+        }
+    return results
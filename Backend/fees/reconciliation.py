@@ -0,0 +1,407 @@
+"""
+Bank statement import and auto-matching.
+
+import_statement() streams a CSV line by line. It works out the column
+mapping from the header and the date format from the first rows once per
+file, then inserts BankStatementEntry rows with bulk_create in chunks.
+
+Every line gets a content hash (date, amount, description, reference, and
+how many identical lines came before it in the file) that is stored with a
+unique index. Uploading the same statement again, or one that overlaps a
+previous upload, only adds the lines that are new. Entries created by hand
+have no hash; those from before migration 0021 were all hashed, since their
+origin was not recorded.
+
+auto_match_unreconciled() pairs unreconciled entries with ONLINE fee
+transactions of the same amount paid within MATCH_WINDOW_DAYS. Both sides
+are loaded once and matched in memory, and the results are written back
+in bulk. Entries that amount and date cannot settle go through a second
+stage that looks their description and reference tokens up in an inverted
+index of student ids, names, contact numbers and receipt numbers.
+"""
+import codecs
+import csv
+import hashlib
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import chain, islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from students.models import Student
+from .models import BankStatementEntry, FeeTransaction, Receipt
+from .money import paise_expr, paise_to_decimal, to_paise
+
+# Candidate header names per field, in order of preference (matched case-insensitively)
+COLUMN_ALIASES = {
+    'date': ['Date', 'Transaction Date'],
+    'description': ['Description', 'Narration'],
+    'amount': ['Amount', 'Credit', 'Transaction Amount'],
+    'ref_number': ['Reference', 'Ref No', 'Cheque/Ref No'],
+}
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%b-%Y')
+DATE_SAMPLE_ROWS = 200
+CHUNK_SIZE = 2000
+MAX_REPORTED_REJECTS = 500
+MATCH_WINDOW_DAYS = 3
+# Reference tokens shorter than this (day numbers, short amounts) are ignored
+MIN_TOKEN_LENGTH = 3
+# Weight of a token hit per kind; a candidate needs MIN_REFERENCE_SCORE to be picked
+REFERENCE_WEIGHTS = {'receipt': 4, 'student_id': 3, 'contact': 3, 'name': 1}
+MIN_REFERENCE_SCORE = 2
+MAX_POSTINGS = 100
+
+
+def detect_columns(header):
+    """{field: [column index, ...]} from the header row. Raises ValueError without date and amount columns."""
+    positions = {name.strip().lower(): i for i, name in reversed(list(enumerate(header)))}
+    columns = {
+        field: [positions[alias.lower()] for alias in aliases if alias.lower() in positions]
+        for field, aliases in COLUMN_ALIASES.items()
+    }
+    missing = [field for field in ('date', 'amount') if not columns[field]]
+    if missing:
+        raise ValueError(f"No {' or '.join(missing)} column found in header: {', '.join(header)}")
+    return columns
+
+
+def detect_date_format(values):
+    """The first format that parses every sample value, else the one that parses the most."""
+    values = [v for v in values if v]
+    best, best_count = DATE_FORMATS[0], -1
+    for fmt in DATE_FORMATS:
+        count = 0
+        for value in values:
+            try:
+                datetime.strptime(value, fmt)
+                count += 1
+            except ValueError:
+                pass
+        if count == len(values):
+            return fmt
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+
+def content_hash(date, amount_paise, description, ref_number, ordinal):
+    """Fingerprint of a statement line; ordinal tells identical lines within one file apart."""
+    normalized = '|'.join([date.isoformat(), str(amount_paise), ' '.join(description.split()), ref_number.strip(), str(ordinal)])
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def _first(row, indices):
+    for i in indices:
+        if i < len(row) and row[i].strip():
+            return row[i].strip()
+    return ''
+
+
+def _amount_paise(value):
+    """Paise for an amount cell. Raises ValueError for text, NaN or infinity, and amounts the column cannot hold."""
+    try:
+        amount = Decimal(value.replace(',', ''))
+        if not amount.is_finite():
+            raise ValueError
+        paise = to_paise(amount)
+        BankStatementEntry._meta.get_field('amount').run_validators(paise_to_decimal(paise))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid amount '{value}'")
+    except ValidationError as e:
+        raise ValueError(f"Invalid amount '{value}': {' '.join(e.messages)}")
+    return paise
+
+
+def _insert(rows):
+    """Insert the (content_hash, date, description, amount, ref_number) rows not stored yet. Returns (created, duplicates)."""
+    existing = set(BankStatementEntry.objects.filter(
+        content_hash__in=[row[0] for row in rows]
+    ).values_list('content_hash', flat=True))
+    new = [
+        BankStatementEntry(content_hash=h, date=date, description=description, amount=amount, ref_number=ref_number)
+        for h, date, description, amount, ref_number in rows if h not in existing
+    ]
+    # ignore_conflicts covers a concurrent upload of the same statement
+    BankStatementEntry.objects.bulk_create(new, ignore_conflicts=True)
+    return len(new), len(rows) - len(new)
+
+
+def import_statement(file_obj, encoding='utf-8-sig', progress=None):
+    """
+    Import a CSV bank statement from a binary file object (an upload or an open file).
+    Returns counts, the detected mapping and date format, and the rejected rows.
+    progress(rows read) is called after each chunk when given.
+    """
+    reader = csv.reader(codecs.iterdecode(file_obj, encoding))
+    header = next(reader, None)
+    if not header:
+        raise ValueError("The file is empty")
+    columns = detect_columns(header)
+
+    sample = list(islice(reader, DATE_SAMPLE_ROWS))
+    date_format = detect_date_format([_first(row, columns['date']) for row in sample])
+
+    created = duplicates = rejected = 0
+    rejects, chunk = [], []
+    seen, dates = {}, {}
+    with transaction.atomic():
+        # Row numbers count the header as row 1, like a spreadsheet
+        for row_number, row in enumerate(chain(sample, reader), start=2):
+            if not any(cell.strip() for cell in row):
+                continue
+            date_val = _first(row, columns['date'])
+            amount_val = _first(row, columns['amount'])
+            error = None
+            if not (date_val and amount_val):
+                error = "Missing date or amount"
+            else:
+                # A statement has a few hundred distinct dates, so each is parsed once
+                date = dates.get(date_val)
+                if date is None:
+                    try:
+                        date = dates[date_val] = datetime.strptime(date_val, date_format).date()
+                    except ValueError:
+                        error = f"Date '{date_val}' does not match {date_format}"
+                try:
+                    amount_paise = _amount_paise(amount_val)
+                except ValueError as e:
+                    error = error or str(e)
+            if error:
+                rejected += 1
+                if len(rejects) < MAX_REPORTED_REJECTS:
+                    rejects.append({'row': row_number, 'error': error})
+                continue
+
+            description = _first(row, columns['description'])
+            ref_number = _first(row, columns['ref_number'])
+            key = (date, amount_paise, ' '.join(description.split()), ref_number)
+            ordinal = seen[key] = seen.get(key, 0) + 1
+            chunk.append((
+                content_hash(date, amount_paise, description, ref_number, ordinal),
+                date, description, paise_to_decimal(amount_paise), ref_number,
+            ))
+            if len(chunk) >= CHUNK_SIZE:
+                new, dup = _insert(chunk)
+                created += new
+                duplicates += dup
+                chunk = []
+                if progress:
+                    progress(row_number - 1)
+        if chunk:
+            new, dup = _insert(chunk)
+            created += new
+            duplicates += dup
+
+    return {
+        'created': created,
+        'duplicates': duplicates,
+        'rejected': rejected,
+        'rejects': rejects,
+        'date_format': date_format,
+        'columns': {field: [header[i] for i in indices] for field, indices in columns.items()},
+    }
+
+
+def statement_summary(result):
+    """The upload_statement response body for an import_statement result."""
+    message = f"Successfully imported {result['created']} entries"
+    if result['duplicates'] or result['rejected']:
+        message += f" ({result['duplicates']} already imported, {result['rejected']} rejected)"
+    return {'message': message, **result}
+
+
+def _transaction_index(transactions):
+    """{amount: (sorted payment dates, transaction indexes in the same order)}."""
+    by_amount = defaultdict(list)
+    for t, (_, amount, paid_on, *_) in enumerate(transactions):
+        by_amount[amount].append((paid_on, t))
+    index = {}
+    for amount, candidates in by_amount.items():
+        candidates.sort()
+        index[amount] = ([paid_on for paid_on, _ in candidates], [t for _, t in candidates])
+    return index
+
+
+def match_entries(entries, transactions):
+    """
+    entries: (id, amount paise, date, ...); transactions: (id, amount paise, payment date, ...).
+    Returns {entry id: transaction id}.
+
+    Matches are assigned closest first: same day, then one day apart, and so on up
+    to MATCH_WINDOW_DAYS. Each entry and transaction is used at most once. A pair is
+    only taken when, at that distance, neither side has another free candidate; an
+    entry or transaction that is ambiguous at its closest distance is left for
+    manual reconciliation rather than matched to something further away.
+    """
+    index = _transaction_index(transactions)
+    pending = [e for e, (_, amount, *_) in enumerate(entries) if amount in index]
+    matches = {}
+    used_transactions = set()
+    for distance in range(MATCH_WINDOW_DAYS + 1):
+        offsets = {timedelta(days=distance), timedelta(days=-distance)}
+        bucket = []
+        for e in pending:
+            _, amount, entry_date = entries[e][:3]
+            dates, candidates = index[amount]
+            for offset in offsets:
+                day = entry_date + offset
+                for t in candidates[bisect_left(dates, day):bisect_right(dates, day)]:
+                    if t not in used_transactions:
+                        bucket.append((e, t))
+
+        per_entry, per_transaction = defaultdict(int), defaultdict(int)
+        for e, t in bucket:
+            per_entry[e] += 1
+            per_transaction[t] += 1
+        for e, t in bucket:
+            if per_entry[e] == 1 and per_transaction[t] == 1:
+                matches[entries[e][0]] = transactions[t][0]
+        # Everything seen at this distance is settled, matched or not
+        used_transactions.update(per_transaction)
+        pending = [e for e in pending if e not in per_entry]
+    return matches
+
+
+def tokenize(*texts):
+    """
+    Upper-case alphanumeric runs of the texts, plus adjacent runs joined together
+    so ids written with separators (2024-015, 98765 43210) still come through whole.
+    """
+    tokens = set()
+    for text in texts:
+        runs = re.findall(r'[A-Z0-9]+', (text or '').upper())
+        tokens.update(runs)
+        tokens.update(a + b for a, b in zip(runs, runs[1:]))
+    # Phone numbers are compared on their last ten digits, without country codes
+    tokens.update([token[-10:] for token in tokens if token.isdigit() and len(token) > 10])
+    return {token for token in tokens if len(token) >= MIN_TOKEN_LENGTH}
+
+
+def build_reference_index(students, receipts):
+    """
+    Inverted index {token: [(key, weight), ...]} where key is ('student', id) or ('receipt', id).
+    students: (id, student_id, name, contact_number); receipts: (id, receipt_no).
+    Tokens shared by more than MAX_POSTINGS keys (a common first name) are dropped.
+    """
+    index = defaultdict(list)
+
+    def add(token, key, weight):
+        if len(token) >= MIN_TOKEN_LENGTH:
+            index[token].append((key, weight))
+
+    for s_id, student_id, name, contact in students:
+        key = ('student', s_id)
+        add(re.sub(r'[^A-Z0-9]', '', (student_id or '').upper()), key, REFERENCE_WEIGHTS['student_id'])
+        name_parts = re.findall(r'[A-Z]+', (name or '').upper())
+        for part in set(name_parts):
+            add(part, key, REFERENCE_WEIGHTS['name'])
+        if len(name_parts) > 1:
+            # The whole name written out is as good as two name hits
+            add(''.join(name_parts[:2]), key, 2 * REFERENCE_WEIGHTS['name'])
+        digits = re.sub(r'\D', '', contact or '')
+        if len(digits) >= 10:
+            add(digits[-10:], key, REFERENCE_WEIGHTS['contact'])
+    for r_id, receipt_no in receipts:
+        add(str(receipt_no), ('receipt', r_id), REFERENCE_WEIGHTS['receipt'])
+    return {token: postings for token, postings in index.items() if len(postings) <= MAX_POSTINGS}
+
+
+def reference_scores(index, tokens):
+    """{key: summed weight} for every student or receipt the tokens point at."""
+    scores = defaultdict(int)
+    for token in tokens:
+        for key, weight in index.get(token, ()):
+            scores[key] += weight
+    return scores
+
+
+def match_by_reference(entries, transactions, index, matched):
+    """
+    Second stage for entries the amount/date pass left unmatched.
+    entries: (id, amount paise, date, description, ref_number);
+    transactions: (id, amount paise, payment date, student id, receipt id).
+    matched: {entry id: transaction id} from match_entries; transactions in it are skipped.
+
+    An entry's tokens point at students and receipts through the index; their
+    free transactions with the entry's amount inside the window are the
+    candidates, scored by the summed token weights. The entry proposes its best
+    candidate (the closer date breaks a tie in score) and a transaction proposed
+    by several entries goes to the single strongest proposal, if there is one.
+    Returns the new {entry id: transaction id} matches.
+    """
+    used = set(matched.values())
+    by_key = defaultdict(list)
+    for t_id, amount, paid_on, student_id, receipt_id in transactions:
+        if t_id not in used:
+            by_key[('student', student_id)].append((t_id, amount, paid_on))
+            by_key[('receipt', receipt_id)].append((t_id, amount, paid_on))
+
+    proposals = defaultdict(list)
+    for e_id, amount, entry_date, description, ref_number in entries:
+        if e_id in matched:
+            continue
+        scores = defaultdict(int)
+        distances = {}
+        for key, weight in reference_scores(index, tokenize(description, ref_number)).items():
+            for t_id, t_amount, paid_on in by_key.get(key, ()):
+                distance = abs((entry_date - paid_on).days)
+                if t_amount == amount and distance <= MATCH_WINDOW_DAYS:
+                    scores[t_id] += weight
+                    distances[t_id] = distance
+        ranked = sorted(
+            ((score, -distances[t_id], t_id) for t_id, score in scores.items() if score >= MIN_REFERENCE_SCORE),
+            reverse=True,
+        )
+        if ranked and (len(ranked) == 1 or ranked[0][:2] != ranked[1][:2]):
+            proposals[ranked[0][2]].append((ranked[0][:2], e_id))
+
+    new_matches = {}
+    for t_id, offers in proposals.items():
+        offers.sort(reverse=True)
+        if len(offers) == 1 or offers[0][0] != offers[1][0]:
+            new_matches[offers[0][1]] = t_id
+    return new_matches
+
+
+def auto_match_unreconciled():
+    """Match unreconciled entries to unmatched ONLINE transactions. Returns the number matched."""
+    with transaction.atomic():
+        unreconciled = BankStatementEntry.objects.select_for_update().filter(is_reconciled=False)
+        entries = list(unreconciled.annotate(amount_paise=paise_expr('amount')).values_list(
+            'id', 'amount_paise', 'date', 'description', 'ref_number'
+        ))
+        if not entries:
+            return 0
+
+        window = timedelta(days=MATCH_WINDOW_DAYS)
+        candidates = FeeTransaction.objects.filter(
+            receipt__payment_mode='ONLINE',
+            bank_matches__isnull=True,
+            payment_date__range=[min(e[2] for e in entries) - window, max(e[2] for e in entries) + window],
+        )
+        transactions = list(candidates.annotate(amount_paise=paise_expr('amount_paid')).values_list(
+            'id', 'amount_paise', 'payment_date', 'student_id', 'receipt_id'
+        ))
+
+        matches = match_entries(entries, transactions)
+        if len(matches) < len(entries):
+            # The index only covers students and receipts that can still be matched, built once per run
+            index = build_reference_index(
+                Student.objects.filter(id__in=candidates.values('student_id')).values_list('id', 'student_id', 'name', 'contact_number'),
+                Receipt.objects.filter(id__in=candidates.values('receipt_id')).values_list('id', 'receipt_no'),
+            )
+            matches.update(match_by_reference(entries, transactions, index, matches))
+
+        BankStatementEntry.objects.bulk_update(
+            [
+                BankStatementEntry(id=e_id, matched_transaction_id=matches[e_id], is_reconciled=True)
+                for e_id, *_ in entries if e_id in matches
+            ],
+            ['matched_transaction', 'is_reconciled'],
+            batch_size=1000,
+        )
+    return len(matches)
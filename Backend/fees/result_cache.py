@@ -0,0 +1,62 @@
+"""
+Versioned result cache for expensive report endpoints.
+
+Results are stored in Django's default cache under a key that includes the
+current fee-data version, so any write to fees, payments or students makes
+old entries unreachable instead of having to find and delete them. Works with
+the local-memory and file-based backends. Hit/miss counters live in the same
+cache so they are shared by workers on a file-based backend.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .versions import FEE_DATA, get_version
+
+
+def _counter_key(namespace, name):
+    return f"result-cache:{namespace}:{name}"
+
+
+def _count(namespace, name):
+    key = _counter_key(namespace, name)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+def cached_result(namespace, params, compute, timeout=None, version_key=FEE_DATA):
+    """
+    Return compute() for these params, reusing the cached value while the data
+    behind version_key (all fee data by default) is unchanged.
+    """
+    version = get_version(version_key)
+    digest = hashlib.sha1(json.dumps([version_key, params], default=str).encode()).hexdigest()
+    key = f"result-cache:{namespace}:v{version}:{digest}"
+
+    value = cache.get(key)
+    if value is not None:
+        _count(namespace, 'hits')
+        return value
+
+    _count(namespace, 'misses')
+    value = compute()
+    cache.set(key, value, timeout if timeout is not None else settings.RESULT_CACHE_TIMEOUT)
+    return value
+
+
+def cache_counters(namespace):
+    hits = cache.get(_counter_key(namespace, 'hits'), 0)
+    misses = cache.get(_counter_key(namespace, 'misses'), 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else 0,
+        'version': get_version(FEE_DATA),
+    }
@@ -0,0 +1,185 @@
+"""
+Session rollover: start a new academic session from the previous one.
+
+rollover_session() clones a session's GlobalFeeSetting, FeeHead and FeeAmount
+rows into the new session, promotes every active student to the next class
+and adds what they still owe for the old session to previous_pending. TC
+students are left alone. The work is a handful of bulk queries, so it takes
+seconds even for a large school. With dry_run=True nothing is written and the
+returned report is the diff that would be applied.
+"""
+import io
+
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from students.models import CLASS_ORDER, Student
+from .engine import get_fee_engine
+from .models import FeeAmount, FeeHead, GlobalFeeSetting, StudentFeeEnrollment, StudentFeePaidTotal
+from .money import from_paise, paise_expr, paise_to_decimal, to_paise
+from .schedule import get_fee_schedule
+from .versions import FEE_DATA, FEE_SCHEDULE, STUDENTS, bump_versions_on_commit, student_ledger_key
+
+HEAD_CLONE_FIELDS = ['name', 'description', 'frequency', 'installment_count', 'due_day', 'due_months',
+                     'late_fee_amount', 'grace_period_days', 'is_transport_fee']
+SETTING_CLONE_FIELDS = ['installment_count', 'due_months', 'due_day', 'late_fee_amount', 'late_fee_start_day',
+                        'late_fee_frequency']
+
+
+def next_class(class_name):
+    """The class after class_name, or None for the final class (or a class not in the list)."""
+    try:
+        index = CLASS_ORDER.index(class_name)
+    except ValueError:
+        return None
+    return CLASS_ORDER[index + 1] if index + 1 < len(CLASS_ORDER) else None
+
+
+def session_balances(session, students):
+    """{student id: paise still owed for the session} (negative if overpaid), computed like pending_fees."""
+    schedule = get_fee_schedule(session)
+    if not students or not schedule.heads:
+        return {s.id: 0 for s in students}
+
+    row_index = {s.id: r for r, s in enumerate(students)}
+    ids = list(row_index)
+    paid_rows = StudentFeePaidTotal.objects.filter(student_id__in=ids, fee_head_id__in=schedule.head_ids).annotate(
+        paid_paise=paise_expr('amount_paid')
+    ).values_list('student_id', 'fee_head_id', 'installment_number', 'paid_paise')
+    opt_out_rows = StudentFeeEnrollment.objects.filter(
+        student_id__in=ids, fee_head_id__in=schedule.head_ids, session=session, is_enrolled=False
+    ).values_list('student_id', 'fee_head_id', 'installment_number')
+
+    dues = get_fee_engine(schedule).compute(
+        [s.student_class for s in students],
+        [s.has_transport for s in students],
+        [s.transport_fee_head_id for s in students],
+        opt_outs=((row_index[s_id], h_id, inst, 1) for s_id, h_id, inst in opt_out_rows),
+    )
+    balance = dues.expected() - dues.paid_tensor(row_index, paid_rows).sum(axis=(1, 2))
+    return dict(zip(ids, balance.tolist()))
+
+
+def _clone_fee_setup(from_session, to_session, dry_run):
+    """
+    Copy settings, heads and amounts. Returns ({old head id: new head id}, counts).
+    A dry run creates nothing, so its map has every head that would be copied with None as the new id.
+    """
+    setting = GlobalFeeSetting.objects.filter(session=from_session).first()
+    heads = list(FeeHead.objects.filter(session=from_session).order_by('id'))
+    amounts = list(FeeAmount.objects.filter(fee_head__in=heads).order_by('id'))
+    counts = {'global_setting': bool(setting), 'fee_heads': len(heads), 'fee_amounts': len(amounts)}
+    if dry_run:
+        return {head.id: None for head in heads}, counts
+
+    if setting:
+        GlobalFeeSetting.objects.create(
+            session=to_session, **{field: getattr(setting, field) for field in SETTING_CLONE_FIELDS}
+        )
+    new_heads = FeeHead.objects.bulk_create([
+        FeeHead(session=to_session, **{field: getattr(head, field) for field in HEAD_CLONE_FIELDS})
+        for head in heads
+    ])
+    head_map = {old.id: new.id for old, new in zip(heads, new_heads)}
+    FeeAmount.objects.bulk_create(
+        [FeeAmount(fee_head_id=head_map[a.fee_head_id], class_name=a.class_name, amount=a.amount) for a in amounts],
+        batch_size=1000,
+    )
+    return head_map, counts
+
+
+def rollover_session(from_session, to_session, dry_run=False):
+    """
+    Start to_session from from_session. Raises ValueError if the rollover does
+    not make sense (same session, nothing to copy, or to_session already set up).
+
+    Returns a report with the fee setup counts, student totals and one change
+    entry per student whose class, opening balance or transport route changes.
+    """
+    if not from_session or not to_session or from_session == to_session:
+        raise ValueError("from_session and to_session must be two different sessions")
+    if not FeeHead.objects.filter(session=from_session).exists():
+        raise ValueError(f"Session {from_session} has no fee heads to roll over")
+    # Guards against running the rollover twice, which would promote everyone again
+    if FeeHead.objects.filter(session=to_session).exists() or GlobalFeeSetting.objects.filter(session=to_session).exists():
+        raise ValueError(f"Session {to_session} is already set up")
+
+    with transaction.atomic():
+        head_map, fee_setup = _clone_fee_setup(from_session, to_session, dry_run)
+
+        students = list(Student.objects.exclude(status='TC').only(
+            'id', 'student_id', 'name', 'student_class', 'has_transport', 'transport_fee_head_id', 'previous_pending'
+        ).order_by('id'))
+        balances = session_balances(from_session, students)
+
+        now = timezone.now()
+        changed, with_carry, changes = [], [], []
+        promoted = final_class = carried = 0
+        for student in students:
+            old_class, old_pending, old_route = student.student_class, student.previous_pending, student.transport_fee_head_id
+            new_class = next_class(old_class)
+            if new_class:
+                promoted += 1
+            else:
+                final_class += 1
+                new_class = old_class
+
+            carry = max(balances[student.id], 0)
+            carried += carry
+            new_pending = paise_to_decimal(to_paise(old_pending) + carry)
+            # Transport routes move to the new session's copy of the head
+            if new_class == old_class and not carry and old_route not in head_map:
+                continue
+            changes.append({
+                'id': student.id,
+                'student_id': student.student_id,
+                'name': student.name,
+                'from_class': old_class,
+                'to_class': new_class,
+                'previous_pending': from_paise(to_paise(old_pending)),
+                'carried_forward': from_paise(carry),
+                'new_previous_pending': from_paise(to_paise(new_pending)),
+            })
+            changed.append(student)
+            if carry:
+                student.previous_pending = new_pending
+                with_carry.append(student)
+
+        if not dry_run:
+            # Class and route changes are the same for everyone in a class or on a route, so they are a
+            # single UPDATE each; only the carried balance differs per student and goes through bulk_update.
+            active = Student.objects.exclude(status='TC')
+            active.update(
+                student_class=Case(
+                    *[When(student_class=c, then=Value(next_class(c))) for c in CLASS_ORDER if next_class(c)],
+                    default=F('student_class'),
+                ),
+                updated_at=now,
+            )
+            if head_map:
+                active.filter(transport_fee_head_id__in=head_map).update(
+                    transport_fee_head_id=Case(*[When(transport_fee_head_id=old, then=Value(new)) for old, new in head_map.items()])
+                )
+            Student.objects.bulk_update(with_carry, ['previous_pending'], batch_size=1000)
+            # bulk writes skip signals: refile collections under the new classes and bump the caches here
+            call_command('rebuild_daily_collections', stdout=io.StringIO())
+            bump_versions_on_commit(
+                [FEE_SCHEDULE, FEE_DATA, STUDENTS] + [student_ledger_key(s.id) for s in changed]
+            )
+
+    return {
+        'from_session': from_session,
+        'to_session': to_session,
+        'dry_run': dry_run,
+        'fee_setup': fee_setup,
+        'students': {
+            'promoted': promoted,
+            'final_class': final_class,
+            'skipped_tc': Student.objects.filter(status='TC').count(),
+            'with_balance': len(with_carry),
+            'carried_forward': from_paise(carried),
+        },
+        'changes': changes,
+    }
@@ -0,0 +1,134 @@
+"""
+Compiled fee schedule for a session.
+
+GlobalFeeSetting, FeeHead and FeeAmount change a few times a year but are
+read on every pending-fee, stats and ledger request. FeeSchedule bundles them
+into one immutable object that is built once per session and cached in the
+worker until the fee-schedule version is bumped, which fees/signals.py does
+on every save or delete of those models (see fees/versions.py).
+All amounts are integer paise (see fees/money.py).
+"""
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from .models import FeeAmount, FeeHead, GlobalFeeSetting
+from .money import paise_expr, split_installments
+from .versions import FEE_SCHEDULE, get_version
+
+TRANSPORT_DISPLAY_NAME = "Transportation Fees"
+
+
+def _parse_months(value):
+    months = []
+    for part in (value or '').split(','):
+        part = part.strip()
+        if part.isdigit():
+            months.append(int(part))
+    return tuple(months)
+
+
+@dataclass(frozen=True)
+class HeadSchedule:
+    id: int
+    name: str
+    display_name: str
+    is_transport_fee: bool
+    frequency: str
+    installment_count: int
+    due_months: tuple
+    # class_name -> total amount for the session, in paise
+    amounts: MappingProxyType
+    # class_name -> tuple of paise due per installment (remainder on the last one)
+    installment_amounts: MappingProxyType
+
+    def applies_to(self, has_transport, transport_fee_head_id):
+        """Transport heads only apply to students assigned to that route."""
+        if not self.is_transport_fee:
+            return True
+        return bool(has_transport) and transport_fee_head_id == self.id
+
+
+@dataclass(frozen=True)
+class FeeSchedule:
+    session: str
+    version: int
+    installment_count: int
+    due_months: tuple
+    due_day: int
+    heads: tuple
+    # class_name -> heads with an amount configured for that class
+    heads_by_class: MappingProxyType
+    heads_by_id: MappingProxyType
+
+    @property
+    def head_ids(self):
+        return list(self.heads_by_id)
+
+    def heads_for_class(self, class_name):
+        return self.heads_by_class.get(class_name, ())
+
+    def heads_for(self, class_name, has_transport, transport_fee_head_id):
+        """Heads a student actually pays: configured for the class and, for transport, their route."""
+        return [
+            h for h in self.heads_for_class(class_name)
+            if h.applies_to(has_transport, transport_fee_head_id)
+        ]
+
+
+def build_fee_schedule(session, version=0):
+    global_settings = GlobalFeeSetting.objects.filter(session=session).first()
+    g_inst_count = global_settings.installment_count if global_settings else 1
+    if g_inst_count <= 0: g_inst_count = 1
+
+    heads = list(FeeHead.objects.filter(session=session).order_by('id'))
+    amounts = {}
+    amounts_qs = FeeAmount.objects.filter(fee_head__in=heads).annotate(amount_paise=paise_expr('amount'))
+    for fee_head_id, class_name, amount in amounts_qs.values_list('fee_head_id', 'class_name', 'amount_paise'):
+        amounts.setdefault(fee_head_id, {})[class_name] = amount
+
+    compiled = []
+    heads_by_class = {}
+    for head in heads:
+        inst_count = 1 if head.frequency == 'ONCE' else g_inst_count
+        head_amounts = amounts.get(head.id, {})
+        compiled_head = HeadSchedule(
+            id=head.id,
+            name=head.name,
+            display_name=TRANSPORT_DISPLAY_NAME if head.is_transport_fee else head.name,
+            is_transport_fee=head.is_transport_fee,
+            frequency=head.frequency,
+            installment_count=inst_count,
+            due_months=_parse_months(head.due_months),
+            amounts=MappingProxyType(head_amounts),
+            installment_amounts=MappingProxyType({c: split_installments(amt, inst_count) for c, amt in head_amounts.items()}),
+        )
+        compiled.append(compiled_head)
+        for class_name in head_amounts:
+            heads_by_class.setdefault(class_name, []).append(compiled_head)
+
+    return FeeSchedule(
+        session=session,
+        version=version,
+        installment_count=g_inst_count,
+        due_months=_parse_months(global_settings.due_months) if global_settings else (),
+        due_day=global_settings.due_day if global_settings else 10,
+        heads=tuple(compiled),
+        heads_by_class=MappingProxyType({c: tuple(hs) for c, hs in heads_by_class.items()}),
+        heads_by_id=MappingProxyType({h.id: h for h in compiled}),
+    )
+
+
+_schedules = {}
+_lock = threading.Lock()
+
+
+def get_fee_schedule(session):
+    """Return the cached schedule for a session, rebuilding it if the version moved on."""
+    version = get_version(FEE_SCHEDULE)
+    schedule = _schedules.get(session)
+    if schedule is None or schedule.version != version:
+        schedule = build_fee_schedule(session, version)
+        with _lock:
+            _schedules[session] = schedule
+    return schedule
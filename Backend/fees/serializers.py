@@ -10,7 +10,8 @@ class BankStatementEntrySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = BankStatementEntry
-        fields = '__all__'
+        # content_hash is the internal duplicate check of statement uploads
+        exclude = ['content_hash']
     
     def get_matched_transaction_details(self, obj):
         if obj.matched_transaction:
@@ -0,0 +1,50 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from students.models import Student
+from .aggregates import reverse_deleted_payment
+from .models import FeeAmount, FeeHead, FeeTransaction, GlobalFeeSetting, Receipt, StudentFeeEnrollment
+from .versions import FEE_DATA, FEE_SCHEDULE, STUDENTS, bump_version_on_commit, student_ledger_key
+
+# Models that feed cached reports such as students/stats/
+FEE_DATA_MODELS = [Receipt, FeeTransaction, FeeAmount, FeeHead, GlobalFeeSetting, StudentFeeEnrollment, Student]
+# Models compiled into the cached fee schedule and engine (fees/schedule.py)
+FEE_SCHEDULE_MODELS = [FeeHead, FeeAmount, GlobalFeeSetting]
+
+
+def fee_data_changed(sender, **kwargs):
+    bump_version_on_commit(FEE_DATA)
+
+
+def fee_schedule_changed(sender, **kwargs):
+    bump_version_on_commit(FEE_SCHEDULE)
+
+
+def students_changed(sender, **kwargs):
+    bump_version_on_commit(STUDENTS)
+
+
+def student_ledger_changed(sender, instance, **kwargs):
+    student_id = instance.pk if sender is Student else instance.student_id
+    bump_version_on_commit(student_ledger_key(student_id))
+
+
+for model in FEE_DATA_MODELS:
+    post_save.connect(fee_data_changed, sender=model, dispatch_uid=f'fee_data_changed.save.{model.__name__}')
+    post_delete.connect(fee_data_changed, sender=model, dispatch_uid=f'fee_data_changed.delete.{model.__name__}')
+
+for model in FEE_SCHEDULE_MODELS:
+    post_save.connect(fee_schedule_changed, sender=model, dispatch_uid=f'fee_schedule_changed.save.{model.__name__}')
+    post_delete.connect(fee_schedule_changed, sender=model, dispatch_uid=f'fee_schedule_changed.delete.{model.__name__}')
+
+# Cached ledgers (students/<id>/ledger/) only depend on that student's rows
+for model in (Receipt, FeeTransaction):
+    post_save.connect(student_ledger_changed, sender=model, dispatch_uid=f'student_ledger_changed.save.{model.__name__}')
+    post_delete.connect(student_ledger_changed, sender=model, dispatch_uid=f'student_ledger_changed.delete.{model.__name__}')
+post_save.connect(student_ledger_changed, sender=Student, dispatch_uid='student_ledger_changed.save.Student')
+
+# ETags for the students list (see fees/conditional.py)
+post_save.connect(students_changed, sender=Student, dispatch_uid='students_changed.save')
+post_delete.connect(students_changed, sender=Student, dispatch_uid='students_changed.delete')
+
+# Take deleted payments out of the aggregates, including cascades from Student and Receipt
+pre_delete.connect(reverse_deleted_payment, sender=FeeTransaction, dispatch_uid='reverse_deleted_payment')
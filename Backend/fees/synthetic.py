@@ -0,0 +1,236 @@
+"""
+Synthetic school data for benchmarks and local testing.
+
+seed_school() builds a realistic school with bulk_create: sessions with
+global settings, regular and transport fee heads with per-class amounts,
+students across all classes, opt-outs, receipts with their transactions
+and a bank statement that mostly matches the online payments. Bulk
+inserts skip signals and the incremental aggregates, so the summary
+tables are rebuilt and the data versions bumped at the end.
+"""
+import io
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.db import transaction
+
+from students.models import Student
+from .models import (
+    BankStatementEntry, DailyCollectionSummary, FeeAmount, FeeHead, FeeTransaction, GlobalFeeSetting,
+    Receipt, StudentFeeEnrollment, StudentFeePaidTotal,
+)
+from .aggregates import reversal_paused
+from .numbering import allocate_receipt_numbers
+from .versions import FEE_DATA, FEE_SCHEDULE, bump_version
+
+CLASSES = [choice for choice, _ in Student._meta.get_field('student_class').choices]
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Ishaan', 'Arjun', 'Ananya', 'Diya', 'Saanvi', 'Aadhya', 'Kavya',
+               'Rohan', 'Kabir', 'Meera', 'Priya', 'Neha', 'Rahul', 'Sneha', 'Vikram', 'Pooja', 'Karan']
+LAST_NAMES = ['Sharma', 'Verma', 'Gupta', 'Singh', 'Patel', 'Kumar', 'Yadav', 'Joshi', 'Mehta', 'Reddy']
+
+# (name, frequency, first class that pays it, base amount for Nursery, increase per class)
+REGULAR_HEADS = [
+    ('Admission Fee', 'ONCE', 0, 5000, 250),
+    ('Tuition Fee', 'INSTALLMENTS', 0, 18000, 1500),
+    ('Exam Fee', 'INSTALLMENTS', 3, 1200, 100),
+    ('Activity Fee', 'INSTALLMENTS', 0, 2000, 0),
+    ('Computer Fee', 'INSTALLMENTS', 5, 2400, 200),
+]
+TRANSPORT_ROUTES = 5
+
+
+def session_start_year(session):
+    return int(session.split('-')[0])
+
+
+def seed_sessions(sessions, installment_count=4):
+    """Global settings, fee heads and per-class amounts. Returns {session: [FeeHead, ...]}."""
+    GlobalFeeSetting.objects.bulk_create([
+        GlobalFeeSetting(session=s, installment_count=installment_count, due_months='4,7,10,1', due_day=10)
+        for s in sessions
+    ])
+    heads = []
+    for s in sessions:
+        for name, frequency, _, _, _ in REGULAR_HEADS:
+            heads.append(FeeHead(name=name, session=s, frequency=frequency, installment_count=installment_count))
+        for route in range(1, TRANSPORT_ROUTES + 1):
+            heads.append(FeeHead(name=f'Bus Route {route}', session=s, frequency='INSTALLMENTS',
+                                 installment_count=installment_count, is_transport_fee=True))
+    FeeHead.objects.bulk_create(heads)
+    heads = list(FeeHead.objects.filter(session__in=sessions).order_by('id'))
+
+    settings_by_name = {name: (first, base, step) for name, _, first, base, step in REGULAR_HEADS}
+    amounts = []
+    for head in heads:
+        for class_index, class_name in enumerate(CLASSES):
+            if head.is_transport_fee:
+                amount = 6000 + 1200 * int(head.name.rsplit(' ', 1)[1])
+            else:
+                first, base, step = settings_by_name[head.name]
+                if class_index < first:
+                    continue
+                amount = base + step * class_index
+            amounts.append(FeeAmount(fee_head=head, class_name=class_name, amount=Decimal(amount)))
+    FeeAmount.objects.bulk_create(amounts, batch_size=1000)
+
+    by_session = {}
+    for head in heads:
+        by_session.setdefault(head.session, []).append(head)
+    return by_session
+
+
+def seed_students(count, routes, rng):
+    students = []
+    for n in range(1, count + 1):
+        has_transport = rng.random() < 0.35
+        students.append(Student(
+            name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            student_id=f'SYN{n:06d}',
+            student_class=rng.choice(CLASSES),
+            contact_number=f'9{rng.randrange(10 ** 9):09d}',
+            has_transport=has_transport,
+            transport_fee_head=rng.choice(routes) if has_transport else None,
+            status='TC' if rng.random() < 0.03 else 'Active',
+            previous_pending=Decimal(rng.choice([0, 0, 0, 500, 1500])),
+        ))
+    Student.objects.bulk_create(students, batch_size=1000)
+    return list(Student.objects.filter(student_id__startswith='SYN').order_by('id'))
+
+
+def seed_payments(students, heads, session, installment_count, rng, online_share=0.3):
+    """One receipt per paid installment. Returns the FeeTransaction rows created."""
+    amounts = {(a.fee_head_id, a.class_name): a.amount for a in FeeAmount.objects.filter(fee_head__in=heads)}
+    start = date(session_start_year(session), 4, 1)
+    today = date.today()
+
+    receipts, receipt_items, receipt_dates = [], [], []
+    for student in students:
+        paid_installments = rng.randint(0, installment_count)
+        for inst in range(1, paid_installments + 1):
+            items = []
+            for head in heads:
+                if head.is_transport_fee and head.id != student.transport_fee_head_id:
+                    continue
+                amount = amounts.get((head.id, student.student_class))
+                if amount is None:
+                    continue
+                if head.frequency == 'ONCE':
+                    if inst != 1:
+                        continue
+                    items.append((head, amount))
+                else:
+                    items.append((head, (amount / installment_count).quantize(Decimal('0.01'))))
+            if not items:
+                continue
+            paid_on = min(start + timedelta(days=90 * (inst - 1) + rng.randrange(30)), today)
+            receipts.append(Receipt(
+                student=student,
+                total_amount=sum(a for _, a in items),
+                payment_mode='ONLINE' if rng.random() < online_share else 'CASH',
+            ))
+            receipt_items.append([(head, amount, inst) for head, amount in items])
+            receipt_dates.append(paid_on)
+
+    for receipt, receipt_no in zip(receipts, allocate_receipt_numbers(len(receipts))):
+        receipt.receipt_no = receipt_no
+    Receipt.objects.bulk_create(receipts, batch_size=1000)
+    transactions = [
+        FeeTransaction(student_id=r.student_id, fee_head=head, receipt=r, amount_paid=amount, installment_number=inst)
+        for r, items in zip(receipts, receipt_items)
+        for head, amount, inst in items
+    ]
+    FeeTransaction.objects.bulk_create(transactions, batch_size=2000)
+
+    # payment_date is auto_now_add, so backdate with one update per day
+    receipt_day = {r.id: day for r, day in zip(receipts, receipt_dates)}
+    receipts_by_day, transactions_by_day = {}, {}
+    for r in receipts:
+        receipts_by_day.setdefault(receipt_day[r.id], []).append(r.id)
+    for t in transactions:
+        t.payment_date = receipt_day[t.receipt_id]
+        transactions_by_day.setdefault(t.payment_date, []).append(t.id)
+    for day, ids in receipts_by_day.items():
+        Receipt.objects.filter(id__in=ids).update(payment_date=day)
+    for day, ids in transactions_by_day.items():
+        FeeTransaction.objects.filter(id__in=ids).update(payment_date=day)
+    return transactions
+
+
+def seed_opt_outs(students, heads, session, installment_count, rng, rate=0.05):
+    optional = [h for h in heads if h.name == 'Activity Fee']
+    if not optional:
+        return 0
+    rows = [
+        StudentFeeEnrollment(student=s, fee_head=optional[0], session=session,
+                             installment_number=rng.randint(1, installment_count), is_enrolled=False)
+        for s in students if rng.random() < rate
+    ]
+    StudentFeeEnrollment.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
+
+
+def seed_bank_statement(transactions, rng, match_rate=0.9, noise_rate=0.05):
+    """Statement rows for most online payments, a day or two late, plus some unrelated credits."""
+    online = FeeTransaction.objects.filter(id__in=[t.id for t in transactions], receipt__payment_mode='ONLINE')
+    entries = []
+    rows = online.values_list('id', 'amount_paid', 'payment_date', 'student__student_id', 'student__name', 'receipt__receipt_no')
+    for t_id, amount, paid_on, student_id, name, receipt_no in rows:
+        if rng.random() < match_rate:
+            # Parents write the student id, name or receipt number in the remark about half the time
+            remark = rng.choice([student_id, name.upper(), f'RCPT {receipt_no}', 'SCHOOL FEES', 'SCHOOL FEES'])
+            entries.append(BankStatementEntry(
+                date=paid_on + timedelta(days=rng.randint(0, 2)),
+                description=f'UPI/NEFT CR {rng.randrange(10 ** 8):08d} {remark}',
+                amount=amount,
+                ref_number=f'TXN{t_id:08d}',
+            ))
+    for _ in range(int(len(entries) * noise_rate)):
+        entries.append(BankStatementEntry(
+            date=date.today() - timedelta(days=rng.randrange(300)),
+            description='INTEREST CREDIT',
+            amount=Decimal(rng.randrange(100, 5000)),
+        ))
+    BankStatementEntry.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+def clear_school():
+    """Delete students and all fee data. DataVersion rows are kept so version stamps keep increasing."""
+    # The summary tables are cleared too, so there is nothing to reverse row by row
+    with reversal_paused():
+        for model in (BankStatementEntry, FeeTransaction, Receipt, StudentFeeEnrollment, StudentFeePaidTotal,
+                      DailyCollectionSummary, FeeAmount, Student, FeeHead, GlobalFeeSetting):
+            model.objects.all().delete()
+
+
+def seed_school(students=1000, sessions=('2025-26', '2026-27'), installment_count=4, seed=42):
+    """Generate a school and return a dict of row counts. The last session gets the payments."""
+    rng = random.Random(seed)
+    with transaction.atomic():
+        heads_by_session = seed_sessions(sessions, installment_count)
+        current = sessions[-1]
+        heads = heads_by_session[current]
+        routes = [h for h in heads if h.is_transport_fee]
+        created_students = seed_students(students, routes, rng)
+        transactions = seed_payments(created_students, heads, current, installment_count, rng)
+        opt_outs = seed_opt_outs(created_students, heads, current, installment_count, rng)
+        bank_entries = seed_bank_statement(transactions, rng)
+
+        quiet = io.StringIO()
+        call_command('rebuild_paid_totals', stdout=quiet)
+        call_command('rebuild_daily_collections', stdout=quiet)
+        bump_version(FEE_SCHEDULE)
+        bump_version(FEE_DATA)
+
+    return {
+        'sessions': len(sessions),
+        'fee_heads': sum(len(h) for h in heads_by_session.values()),
+        'students': len(created_students),
+        'receipts': Receipt.objects.count(),
+        'transactions': len(transactions),
+        'opt_outs': opt_outs,
+        'bank_entries': bank_entries,
+    }
@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+
+from django.test import SimpleTestCase
+
+from .reconciliation import build_reference_index, match_by_reference, match_entries, tokenize
+
+DAY = date(2026, 5, 10)
+
+
+def day(offset):
+    return DAY + timedelta(days=offset)
+
+
+class MatchEntriesTests(SimpleTestCase):
+    """Amount and date matching. Entries are (id, paise, date); transactions are (id, paise, payment date)."""
+
+    CASES = [
+        ('same day', [(1, 500, day(0))], [(10, 500, day(0))], {1: 10}),
+        ('other amount', [(1, 500, day(0))], [(10, 600, day(0))], {}),
+        ('edge of the window', [(1, 500, day(0))], [(10, 500, day(3))], {1: 10}),
+        ('outside the window', [(1, 500, day(0))], [(10, 500, day(-4))], {}),
+        ('closer transaction wins', [(1, 500, day(0))], [(10, 500, day(2)), (11, 500, day(-1))], {1: 11}),
+        # Ambiguous at the closest distance: left for manual reconciliation, not matched further away
+        ('two transactions same day', [(1, 500, day(0))], [(10, 500, day(0)), (11, 500, day(0)), (12, 500, day(1))], {}),
+        ('two transactions a day either side', [(1, 500, day(0))], [(10, 500, day(-1)), (11, 500, day(1))], {}),
+        ('two entries for one transaction', [(1, 500, day(0)), (2, 500, day(0))], [(10, 500, day(0))], {}),
+        # Each transaction is used once: entry 2 does not get the transaction entry 1 took
+        ('transaction used once', [(1, 500, day(0)), (2, 500, day(1))], [(10, 500, day(0))], {1: 10}),
+        ('closest pairs first', [(1, 500, day(0)), (2, 500, day(1))], [(10, 500, day(0)), (11, 500, day(2))], {1: 10, 2: 11}),
+        ('amounts kept apart', [(1, 500, day(0)), (2, 700, day(0))], [(10, 700, day(0)), (11, 500, day(0))], {1: 11, 2: 10}),
+    ]
+
+    def test_match_entries(self):
+        for name, entries, transactions, expected in self.CASES:
+            with self.subTest(name):
+                self.assertEqual(match_entries(entries, transactions), expected)
+
+
+class TokenizeTests(SimpleTestCase):
+    CASES = [
+        # (texts, tokens that must be present, tokens that must not be)
+        (('NEFT/2024-015/RAHUL',), {'NEFT', '2024', '015', 'RAHUL', '2024015'}, set()),
+        (('upi 98765 43210',), {'UPI', '98765', '43210', '9876543210'}, set()),
+        (('+91 98765 43210',), {'9876543210'}, {'91'}),
+        (('919876543210',), {'919876543210', '9876543210'}, set()),
+        (('to 5 ab',), set(), {'TO', '5', 'AB'}),
+        (('Fee paid', None), {'FEE', 'PAID', 'FEEPAID'}, set()),
+        (('rahul', 'REF 1234'), {'RAHUL', 'REF', '1234', 'REF1234'}, set()),
+    ]
+
+    def test_tokenize(self):
+        for texts, present, absent in self.CASES:
+            with self.subTest(texts=texts):
+                tokens = tokenize(*texts)
+                self.assertLessEqual(present, tokens)
+                self.assertFalse(absent & tokens)
+
+
+class MatchByReferenceTests(SimpleTestCase):
+    """Reference matching. Transactions are (id, paise, payment date, student id, receipt id)."""
+
+    STUDENTS = [
+        (1, 'SYN000123', 'Rahul Sharma', '9876543210'),
+        (2, 'SYN000456', 'Priya Verma', '9123456780'),
+        (3, 'SYN000789', 'Karan Mehta', None),
+    ]
+    RECEIPTS = [(101, 5001), (102, 5002), (103, 5003)]
+    TRANSACTIONS = [
+        (11, 500, day(0), 1, 101),
+        (12, 500, day(1), 2, 102),
+        (13, 500, day(-2), 3, 103),
+    ]
+
+    def match(self, entries, matched=None):
+        index = build_reference_index(self.STUDENTS, self.RECEIPTS)
+        return match_by_reference(entries, self.TRANSACTIONS, index, matched or {})
+
+    def test_match_by_reference(self):
+        cases = [
+            ('student id', [(1, 500, day(0), 'FEES SYN000123', '')], {1: 11}),
+            ('student id with separators in the reference', [(1, 500, day(0), 'UPI', 'SYN-000456')], {1: 12}),
+            ('contact number with country code', [(1, 500, day(0), 'IMPS +91 98765 43210', '')], {1: 11}),
+            ('receipt number', [(1, 500, day(0), 'SCHOOL FEE', '5003')], {1: 13}),
+            ('other amount', [(1, 900, day(0), 'FEES SYN000123', '')], {}),
+            ('outside the window', [(1, 500, day(4), 'FEES SYN000123', '')], {}),
+            ('one name is below the minimum score', [(1, 500, day(0), 'RAHUL', '')], {}),
+            # Contact (3) + name (1) for Rahul beats Priya's student id (3)
+            ('higher score wins', [(1, 500, day(0), 'RAHUL 9876543210 SYN000456', '')], {1: 11}),
+            # Rahul's full name (4) and Priya's receipt (4) tie on score; Rahul's payment is closer
+            ('closer date breaks a score tie', [(1, 500, day(0), 'RAHUL SHARMA 5002', '')], {1: 11}),
+            # Rahul's full name (4) and Karan's receipt (4), both a day away: ambiguous
+            ('tie on score and distance', [(1, 500, day(-1), 'RAHUL SHARMA', '5003')], {}),
+            # Both entries want Rahul's payment: the stronger one gets it
+            ('stronger of two proposals', [
+                (1, 500, day(0), 'SYN000123', ''),
+                (2, 500, day(0), 'SYN000123 RAHUL SHARMA', ''),
+            ], {2: 11}),
+            ('equal proposals', [
+                (1, 500, day(0), 'SYN000123', ''),
+                (2, 500, day(0), 'SYN000123', ''),
+            ], {}),
+        ]
+        for name, entries, expected in cases:
+            with self.subTest(name):
+                self.assertEqual(self.match(entries), expected)
+
+    def test_skips_matched_entries_and_their_transactions(self):
+        entries = [(1, 500, day(0), 'FEES SYN000123', ''), (2, 500, day(0), 'SYN000456', '')]
+        # Entry 2 was matched to Rahul's payment by amount and date: both are left alone
+        self.assertEqual(self.match(entries, {2: 11}), {})
+        self.assertEqual(self.match(entries, {3: 11}), {2: 12})
@@ -3,7 +3,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     FeeHeadViewSet, FeeStructureViewSet, StudentFeeViewSet, 
     FeeTransactionViewSet, GlobalFeeSettingViewSet, ReceiptViewSet,
-    BankReconciliationViewSet
+    BankReconciliationViewSet, FeeExportViewSet
 )
 
 router = DefaultRouter()
@@ -14,6 +14,7 @@ router.register(r'transactions', FeeTransactionViewSet)
 router.register(r'receipts', ReceiptViewSet)
 router.register(r'settings', GlobalFeeSettingViewSet)
 router.register(r'reconciliation', BankReconciliationViewSet)
+router.register(r'exports', FeeExportViewSet, basename='export')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -0,0 +1,78 @@
+"""
+Version stamps for in-process caches.
+
+Each key is a counter row in DataVersion. Writers bump the counter; readers
+compare it against the version their cached object was built from, so every
+gunicorn worker notices a change on its next request.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DataVersion
+
+# Fee heads, amounts and global settings (bumped by fees/signals.py)
+FEE_SCHEDULE = 'fee-schedule'
+# Any write to fee, payment or student data (bumped by fees/signals.py)
+FEE_DATA = 'fee-data'
+# Student records (bumped by fees/signals.py)
+STUDENTS = 'students'
+
+
+def student_ledger_key(student_id):
+    """Bumped when one student's receipts, payments or details change (see fees/signals.py)."""
+    return f'student-ledger:{student_id}'
+
+
+def get_version(key):
+    return DataVersion.objects.filter(key=key).values_list('version', flat=True).first() or 0
+
+
+def bump_version(key):
+    rows = DataVersion.objects.filter(key=key)
+    if rows.update(version=F('version') + 1, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            DataVersion.objects.create(key=key, version=1)
+    except IntegrityError:
+        rows.update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def bump_versions(keys):
+    """Bump many keys with one UPDATE plus one INSERT for keys seen for the first time."""
+    keys = set(keys)
+    now = timezone.now()
+    DataVersion.objects.filter(key__in=keys).update(version=F('version') + 1, updated_at=now)
+    existing = set(DataVersion.objects.filter(key__in=keys).values_list('key', flat=True))
+    DataVersion.objects.bulk_create(
+        [DataVersion(key=key, version=1) for key in keys - existing],
+        ignore_conflicts=True,
+    )
+
+
+def bump_version_on_commit(key):
+    bump_versions_on_commit([key])
+
+
+def bump_versions_on_commit(keys):
+    """
+    Bump the keys once the surrounding transaction commits (immediately in autocommit mode).
+    Keys registered during one transaction are collected on the connection and the first
+    callback to run bumps them all with one bump_versions call, so saving a receipt and its
+    transactions costs one bump instead of one per row and key.
+    """
+    connection = transaction.get_connection()
+    pending = connection.__dict__.setdefault('pending_version_bumps', set())
+    pending.update(keys)
+
+    def flush():
+        if pending:
+            flushed = set(pending)
+            pending.clear()
+            bump_versions(flushed)
+
+    # Registered on every call: a callback from a rolled-back savepoint is dropped, and a later
+    # one still has to flush. Keys left over from a rollback are bumped with the next commit,
+    # which only costs those caches a rebuild.
+    transaction.on_commit(flush)
@@ -1,6 +1,5 @@
 import csv
-import io
-from datetime import datetime, timedelta
+from datetime import datetime
 from rest_framework import viewsets, filters, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
@@ -10,12 +9,25 @@ from .serializers import (
     FeeTransactionSerializer, GlobalFeeSettingSerializer, ReceiptSerializer,
     BankStatementEntrySerializer
 )
-from django.db.models import Max, Sum
+from django.db.models import Prefetch, Sum
 from django.db import transaction
+from .aggregates import record_payments, reverse_payments, adjust_payment
+from .conditional import ConditionalGetMixin
+from .versions import FEE_SCHEDULE
+from .money import to_paise, paise_to_decimal
+from school_erp.pagination import OptInCursorPagination
+from .numbering import next_receipt_number
+from .posting import post_receipts
+from .rollover import rollover_session
+from .reconciliation import auto_match_unreconciled, import_statement, statement_summary
+from .exports import build_export, export_response, parse_file_type
+from jobs.runner import enqueue
+from jobs.views import async_requested, job_accepted
 
-class FeeHeadViewSet(viewsets.ModelViewSet):
+class FeeHeadViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = FeeHead.objects.all()
     serializer_class = FeeHeadSerializer
+    conditional_version_keys = [FEE_SCHEDULE]
     
     def get_queryset(self):
         queryset = FeeHead.objects.all()
@@ -24,6 +36,7 @@ class FeeHeadViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(session=session)
         return queryset
     
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         # Extract amounts from request data
         amounts_data = request.data.pop('amounts', [])
@@ -50,6 +63,7 @@ class FeeHeadViewSet(viewsets.ModelViewSet):
             headers=headers
         )
     
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
@@ -84,18 +98,51 @@ class StudentFeeViewSet(viewsets.ModelViewSet):
     serializer_class = StudentFeeSerializer
     filterset_fields = ['student', 'is_paid']
 
+class FeeTransactionPagination(OptInCursorPagination):
+    ordering = ('-payment_date', '-id')
+
 class FeeTransactionViewSet(viewsets.ModelViewSet):
-    queryset = FeeTransaction.objects.all().order_by('-payment_date', '-id')
+    queryset = FeeTransaction.objects.select_related('student', 'receipt', 'fee_head').order_by('-payment_date', '-id')
     serializer_class = FeeTransactionSerializer
+    pagination_class = FeeTransactionPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ['student__name', 'student__student_id']
     filterset_fields = ['student']
 
+    @transaction.atomic
+    def perform_create(self, serializer):
+        trans = serializer.save()
+        record_payments([trans])
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        old = FeeTransaction.objects.get(pk=serializer.instance.pk)
+        trans = serializer.save()
+        # The daily summary key also depends on the receipt (its payment mode)
+        if (old.student_id, old.fee_head_id, old.installment_number, old.receipt_id) == (trans.student_id, trans.fee_head_id, trans.installment_number, trans.receipt_id):
+            adjust_payment(trans, old.amount_paid)
+        else:
+            reverse_payments([old])
+            record_payments([trans])
+
+class ReceiptPagination(OptInCursorPagination):
+    ordering = '-receipt_no'
+
 class ReceiptViewSet(viewsets.ModelViewSet):
-    queryset = Receipt.objects.all().order_by('-receipt_no')
+    queryset = Receipt.objects.select_related('student').order_by('-receipt_no')
     serializer_class = ReceiptSerializer
+    pagination_class = ReceiptPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ['student__name', 'student__student_id', 'receipt_no']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # Only for reads: update() edits transactions and must not serialize a stale prefetch
+            queryset = queryset.prefetch_related(
+                Prefetch('transactions', queryset=FeeTransaction.objects.select_related('student', 'receipt', 'fee_head'))
+            )
+        return queryset
     
     @transaction.atomic
     def create(self, request, *args, **kwargs):
@@ -106,11 +153,10 @@ class ReceiptViewSet(viewsets.ModelViewSet):
         payment_mode = data.get('payment_mode', 'CASH')
         payment_date = data.get('payment_date', None)  # Accept custom payment date
         
-        # Get next receipt number
-        max_no = Receipt.objects.aggregate(Max('receipt_no'))['receipt_no__max'] or 0
-        receipt_no = max_no + 1
+        # Get next receipt number (locks the counter row until this transaction commits)
+        receipt_no = next_receipt_number()
         
-        total_amount = sum(float(item['amount_paid']) for item in payment_items)
+        total_amount = paise_to_decimal(sum(to_paise(item['amount_paid']) for item in payment_items))
         
         # Create receipt with custom date if provided
         receipt_data = {
@@ -129,15 +175,17 @@ class ReceiptViewSet(viewsets.ModelViewSet):
         else:
             receipt = Receipt.objects.create(**receipt_data)
         
+        created_transactions = []
         for item in payment_items:
-            FeeTransaction.objects.create(
+            created_transactions.append(FeeTransaction.objects.create(
                 student_id=student_id,
                 fee_head_id=item['fee_head'],
                 receipt=receipt,
                 amount_paid=item['amount_paid'],
                 installment_number=item['installment_number'],
                 remarks=remarks
-            )
+            ))
+        record_payments(created_transactions)
             
         return Response(ReceiptSerializer(receipt).data, status=status.HTTP_201_CREATED)
 
@@ -159,9 +207,11 @@ class ReceiptViewSet(viewsets.ModelViewSet):
                 trans_id = item.get('transaction_id')
                 if trans_id:
                      trans = FeeTransaction.objects.get(id=trans_id, receipt=instance)
+                     old_amount = trans.amount_paid
                      trans.amount_paid = float(item['amount_paid'])
                      trans.remarks = remarks
                      trans.save()
+                     adjust_payment(trans, old_amount)
             except FeeTransaction.DoesNotExist:
                 continue
                 
@@ -171,7 +221,33 @@ class ReceiptViewSet(viewsets.ModelViewSet):
         instance.save()
         
         return Response(ReceiptSerializer(instance).data)
+
+    @transaction.atomic
+    def destroy(self, request, *args, **kwargs):
+        instance = self.get_object()
+        # Its transactions are taken out of the aggregates by the pre_delete handler
+        instance.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
     
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Post many receipts in one request.
+        POST body: {"receipts": [<same body as a single receipt POST>, ...]}
+        Every receipt is validated first; valid ones are posted together and
+        the response reports the outcome of each one in request order.
+        """
+        entries = request.data.get('receipts')
+        if not isinstance(entries, list) or not entries:
+            return Response({'error': 'receipts must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = post_receipts(entries)
+        created = sum(1 for r in results if r['status'] == 'created')
+        return Response(
+            {'created': created, 'failed': len(results) - created, 'results': results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
     @action(detail=True, methods=['get'])
     def print_receipt(self, request, pk=None):
         """
@@ -210,10 +286,11 @@ class ReceiptViewSet(viewsets.ModelViewSet):
         
         return Response(receipt_data)
 
-class GlobalFeeSettingViewSet(viewsets.ModelViewSet):
+class GlobalFeeSettingViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = GlobalFeeSetting.objects.all()
     serializer_class = GlobalFeeSettingSerializer
     lookup_field = 'session'
+    conditional_version_keys = [FEE_SCHEDULE]
 
     def create(self, request, *args, **kwargs):
         session = request.data.get('session')
@@ -231,12 +308,25 @@ class GlobalFeeSettingViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.data, status=status.HTTP_200_OK if instance else status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'])
+    def rollover(self, request):
+        """
+        Start a new session from an old one: {"from_session": "2025-26", "to_session": "2026-27", "dry_run": true}.
+        See fees/rollover.py.
+        """
+        dry_run = str(request.data.get('dry_run', '')).lower() in ['true', '1', 'yes']
+        try:
+            report = rollover_session(request.data.get('from_session'), request.data.get('to_session'), dry_run=dry_run)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
 class BankReconciliationViewSet(viewsets.ModelViewSet):
     queryset = BankStatementEntry.objects.all().order_by('-date')
     serializer_class = BankStatementEntrySerializer
 
     def get_queryset(self):
-        queryset = BankStatementEntry.objects.all().order_by('-date')
+        queryset = BankStatementEntry.objects.select_related('matched_transaction__student').order_by('-date')
         is_reconciled = self.request.query_params.get('is_reconciled')
         if is_reconciled is not None:
             is_reconciled = is_reconciled.lower() == 'true'
@@ -248,94 +338,22 @@ class BankReconciliationViewSet(viewsets.ModelViewSet):
         file_obj = request.FILES.get('file')
         if not file_obj:
             return Response({'error': 'No file uploaded'}, status=400)
-        
+        if async_requested(request):
+            return job_accepted(enqueue('import_statement', payload=file_obj.read(), payload_name=file_obj.name))
+
         try:
-            decoded_file = file_obj.read().decode('utf-8')
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
-            
-            entries_created = 0
-            for row in reader:
-                try:
-                    # Generic mapping: detect common bank statement column names
-                    date_val = row.get('Date') or row.get('date') or row.get('Transaction Date')
-                    desc = row.get('Description') or row.get('description') or row.get('Narration') or ''
-                    amt = row.get('Amount') or row.get('amount') or row.get('Credit') or row.get('Transaction Amount')
-                    ref = row.get('Reference') or row.get('Ref No') or row.get('Cheque/Ref No') or ''
-                    
-                    if not (date_val and amt):
-                        continue
-                    
-                    # Ensure amount is absolute (we usually look for credits in bank reco)
-                    # but for now we store raw value
-                    try:
-                        clean_amt = float(str(amt).replace(',', ''))
-                    except:
-                        continue
-                        
-                    # Parse date
-                    parsed_date = None
-                    for fmt in ('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%b-%Y'):
-                        try:
-                            parsed_date = datetime.strptime(date_val.strip(), fmt).date()
-                            break
-                        except:
-                            continue
-                            
-                    if not parsed_date:
-                        continue
-                        
-                    BankStatementEntry.objects.create(
-                        date=parsed_date,
-                        description=desc,
-                        amount=clean_amt,
-                        ref_number=ref
-                    )
-                    entries_created += 1
-                except Exception as row_e:
-                    print(f"Row skip error: {row_e}")
-                    continue
-            
-            return Response({'message': f'Successfully imported {entries_created} entries'})
-        except Exception as e:
-            return Response({'error': f'Failed to parse file: {str(e)}'}, status=500)
+            result = import_statement(file_obj)
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            return Response({'error': f'Failed to parse file: {str(e)}'}, status=400)
+
+        return Response(statement_summary(result))
 
     @action(detail=False, methods=['post'])
     def auto_match(self, request):
-        unreconciled = BankStatementEntry.objects.filter(is_reconciled=False)
-        matched_count = 0
-        
-        for entry in unreconciled:
-            # Range: +/- 3 days
-            start_date = entry.date - timedelta(days=3)
-            end_date = entry.date + timedelta(days=3)
-            
-            # Match by total_amount in FeeTransaction
-            # Note: FeeTransaction.amount_paid is Decimal
-            # Only match if the linked Receipt is marked as 'ONLINE'
-            candidates = FeeTransaction.objects.filter(
-                receipt__payment_mode='ONLINE',
-                amount_paid=entry.amount,
-                payment_date__range=[start_date, end_date],
-                bank_matches__isnull=True
-            )
-            
-            if candidates.count() == 1:
-                match = candidates.first()
-                entry.matched_transaction = match
-                entry.is_reconciled = True
-                entry.save()
-                matched_count += 1
-            elif candidates.count() > 1:
-                # Try exact date
-                exact = candidates.filter(payment_date=entry.date)
-                if exact.count() == 1:
-                    match = exact.first()
-                    entry.matched_transaction = match
-                    entry.is_reconciled = True
-                    entry.save()
-                    matched_count += 1
-                    
+        if async_requested(request):
+            return job_accepted(enqueue('auto_match'))
+        # Exact amount within +/- 3 days of an ONLINE receipt's transaction, closest first (see fees/reconciliation.py)
+        matched_count = auto_match_unreconciled()
         return Response({'message': f'Successfully auto-matched {matched_count} entries'})
 
     @action(detail=True, methods=['post'])
@@ -386,7 +404,7 @@ class BankReconciliationViewSet(viewsets.ModelViewSet):
         transactions = FeeTransaction.objects.filter(
             receipt__payment_mode='ONLINE',
             bank_matches__isnull=True
-        ).order_by('-payment_date')
+        ).select_related('student', 'receipt', 'fee_head').order_by('-payment_date')
         
         serializer = FeeTransactionSerializer(transactions, many=True)
         return Response(serializer.data)
@@ -419,3 +437,34 @@ class BankReconciliationViewSet(viewsets.ModelViewSet):
         
         return Response({'message': 'ERP Transaction reconciled successfully'})
 
+class FeeExportViewSet(viewsets.ViewSet):
+    """
+    Streamed CSV (default) or XLSX downloads; add ?file_type=xlsx for Excel and
+    ?async=true to build the file in a background job. See fees/exports.py.
+    """
+
+    def _export(self, request, kind):
+        params = request.query_params.dict()
+        try:
+            file_type = parse_file_type(params)
+            export = build_export(kind, params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if async_requested(request):
+            return job_accepted(enqueue('export', params={**params, 'export': kind}))
+        return export_response(export, file_type)
+
+    @action(detail=False, methods=['get'])
+    def defaulters(self, request):
+        """Pending fees per student: ?session=&student_class=&show_all=true"""
+        return self._export(request, 'defaulters')
+
+    @action(detail=False, methods=['get'])
+    def daybook(self, request):
+        """Fee transactions: ?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD&payment_mode="""
+        return self._export(request, 'daybook')
+
+    @action(detail=False, methods=['get'])
+    def receipts(self, request):
+        """Receipts: ?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD&payment_mode="""
+        return self._export(request, 'receipts')
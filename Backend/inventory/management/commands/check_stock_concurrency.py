@@ -0,0 +1,120 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from inventory.models import InventoryItem, InventoryTransaction
+from inventory.stock import InsufficientStock, post_movements
+
+
+def run_threads(count, target):
+    errors = []
+
+    def worker(n):
+        try:
+            target(n)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            # Each thread has its own connection
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise CommandError(f"{len(errors)} worker(s) failed, first error: {errors[0]!r}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Post stock movements from many threads at once in a throwaway test database "
+        "and check that the final quantities add up (no lost updates, no negative stock with the guard on)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--movements', type=int, default=50, help="Movements posted by each thread")
+
+    def handle(self, *args, **options):
+        threads, movements = options['threads'], options['movements']
+        test_settings = connection.settings_dict['TEST']
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            # Threads cannot share SQLite's in-memory test database: its tables lock instead of waiting
+            test_settings['NAME'] = os.path.join(tempfile.gettempdir(), 'check_stock_concurrency.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            checks = [
+                self.check_single_posts(threads, movements),
+                self.check_batches(threads, movements),
+                self.check_guard(threads, movements),
+            ]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, expected, actual, elapsed in checks:
+            ok = expected == actual
+            line = f"{name:<30} expected {str(expected):>16}  got {str(actual):>16}  {elapsed:>6.2f}s"
+            self.stdout.write(self.style.SUCCESS(line) if ok else self.style.ERROR(line))
+        if any(expected != actual for _, expected, actual, _ in checks):
+            raise CommandError("Stock quantities do not add up")
+
+    def check_single_posts(self, threads, movements):
+        """Every thread issues one unit at a time through InventoryTransaction.save()."""
+        item = InventoryItem.objects.create(name='Notebook', quantity=threads * movements)
+        start = time.perf_counter()
+        run_threads(threads, lambda n: [
+            InventoryTransaction(item_id=item.id, transaction_type='OUT', quantity=1).save(allow_negative=True)
+            for _ in range(movements)
+        ])
+        elapsed = time.perf_counter() - start
+        actual = InventoryItem.objects.get(id=item.id).quantity
+        return 'single posts, one item', 0, actual, elapsed
+
+    def check_batches(self, threads, movements):
+        """Every thread posts one batch spread over three items, with receipts mixed in."""
+        items = [InventoryItem.objects.create(name=f'Item {n}', quantity=1000) for n in range(3)]
+
+        def post(n):
+            post_movements([
+                {'item': items[i % 3].id, 'transaction_type': 'OUT' if i % 4 else 'IN', 'quantity': 2}
+                for i in range(movements)
+            ], allow_negative=True)
+
+        start = time.perf_counter()
+        run_threads(threads, post)
+        elapsed = time.perf_counter() - start
+        expected = 3000
+        for i in range(movements):
+            expected += threads * (2 if i % 4 == 0 else -2)
+        actual = sum(InventoryItem.objects.filter(id__in=[i.id for i in items]).values_list('quantity', flat=True))
+        return 'batches, three items', expected, actual, elapsed
+
+    def check_guard(self, threads, movements):
+        """More issues than stock with the guard on: stock must stop at zero and the rest be rejected."""
+        stock = threads * movements // 2
+        item = InventoryItem.objects.create(name='Pencil box', quantity=stock)
+        rejected = []
+
+        def issue(n):
+            for _ in range(movements):
+                try:
+                    InventoryTransaction(item_id=item.id, transaction_type='OUT', quantity=1).save(allow_negative=False)
+                except InsufficientStock:
+                    rejected.append(1)
+
+        start = time.perf_counter()
+        run_threads(threads, issue)
+        elapsed = time.perf_counter() - start
+        issued = InventoryTransaction.objects.filter(item_id=item.id).count()
+        quantity = InventoryItem.objects.get(id=item.id).quantity
+        # (quantity left, movements posted, movements rejected)
+        return 'guarded issues beyond stock', (0, stock, threads * movements - stock), (quantity, issued, len(rejected)), elapsed
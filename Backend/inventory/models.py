@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 class InventoryItem(models.Model):
     CATEGORY_CHOICES = [
@@ -29,14 +29,16 @@ class InventoryTransaction(models.Model):
     transaction_date = models.DateTimeField(auto_now_add=True)
     remarks = models.TextField(blank=True)
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, allow_negative=None, **kwargs):
         # Update item quantity on save
         if not self.pk: # Only on creation
-            if self.transaction_type == 'IN':
-                self.item.quantity += self.quantity
-            elif self.transaction_type == 'OUT':
-                self.item.quantity -= self.quantity
-            self.item.save()
+            # Imported here: stock.py imports these models
+            from .stock import change_stock, stock_delta
+            with transaction.atomic():
+                # An F() update, so concurrent movements of the same item are all counted
+                change_stock(self.item_id, stock_delta(self.transaction_type, self.quantity), allow_negative)
+                super().save(*args, **kwargs)
+            return
         super().save(*args, **kwargs)
 
     def __str__(self):
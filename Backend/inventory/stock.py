@@ -0,0 +1,153 @@
+"""
+Stock movements.
+
+Item quantities only change through UPDATE ... SET quantity = quantity + n,
+so movements posted at the same time never overwrite each other. With the
+negative-stock guard on, the stock check is part of the same UPDATE
+(WHERE quantity >= n), so two issues cannot both take the last units.
+
+post_movements() posts a batch, e.g. the start-of-term stationery issue, in
+one transaction: one UPDATE per item for its net change and one bulk_create
+for the movement rows.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import InventoryItem, InventoryTransaction
+
+TRANSACTION_TYPES = {choice for choice, _ in InventoryTransaction._meta.get_field('transaction_type').choices}
+
+
+class InsufficientStock(ValueError):
+    pass
+
+
+def allow_negative_default():
+    return getattr(settings, 'INVENTORY_ALLOW_NEGATIVE_STOCK', True)
+
+
+def stock_delta(transaction_type, quantity):
+    return quantity if transaction_type == 'IN' else -quantity
+
+
+def change_stock(item_id, delta, allow_negative=None):
+    """Add delta to the item's quantity. Raises InsufficientStock if the guard is on and it would go below zero."""
+    if allow_negative is None:
+        allow_negative = allow_negative_default()
+    rows = InventoryItem.objects.filter(id=item_id)
+    if delta < 0 and not allow_negative:
+        rows = rows.filter(quantity__gte=-delta)
+    if not rows.update(quantity=F('quantity') + delta):
+        if not InventoryItem.objects.filter(id=item_id).exists():
+            raise InventoryItem.DoesNotExist(f'Unknown item: {item_id}')
+        raise InsufficientStock(f'Not enough stock of item {item_id} to issue {-delta}')
+
+
+def _whole_number(value):
+    """value as an int if it is a whole number (2, "2", 2.0), else None. True and 2.5 are not coerced."""
+    if isinstance(value, bool):
+        return None
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        return None
+    if not number.is_finite() or number != number.to_integral_value():
+        return None
+    return int(number)
+
+
+def _validate(entry, item_ids):
+    """Return (cleaned movement, errors) for one movement of the batch."""
+    if not isinstance(entry, dict):
+        return None, ['Movement must be an object']
+    errors = []
+    try:
+        item_id = int(entry.get('item'))
+    except (TypeError, ValueError):
+        item_id = None
+    if item_id not in item_ids:
+        errors.append(f"Unknown item: {entry.get('item')}")
+
+    transaction_type = entry.get('transaction_type')
+    if transaction_type not in TRANSACTION_TYPES:
+        errors.append(f'Invalid transaction_type: {transaction_type}')
+
+    quantity = _whole_number(entry.get('quantity'))
+    if quantity is None or quantity <= 0:
+        errors.append('quantity must be a positive whole number')
+
+    if errors:
+        return None, errors
+    return {
+        'item_id': item_id,
+        'transaction_type': transaction_type,
+        'quantity': quantity,
+        'remarks': entry.get('remarks') or '',
+    }, []
+
+
+def post_movements(entries, allow_negative=None):
+    """
+    Validate and post a batch of movements shaped like InventoryTransactionViewSet.create's body:
+        {"item": 3, "transaction_type": "OUT", "quantity": 40, "remarks": "Class 5 issue"}
+    Invalid movements are reported and skipped. With the guard on, an item whose
+    net change for the batch would take it below zero has all its movements
+    rejected; the guard looks at the net change, not at the order within the batch.
+    Returns one result dict per entry, in order.
+    """
+    if allow_negative is None:
+        allow_negative = allow_negative_default()
+    requested = []
+    for entry in entries:
+        try:
+            requested.append(int(entry.get('item')))
+        except (AttributeError, TypeError, ValueError):
+            pass
+    item_ids = set(InventoryItem.objects.filter(id__in=requested).values_list('id', flat=True))
+
+    results, valid = [], []
+    for index, entry in enumerate(entries):
+        cleaned, errors = _validate(entry, item_ids)
+        if errors:
+            results.append({'index': index, 'status': 'failed', 'errors': errors})
+        else:
+            results.append(None)
+            valid.append((index, cleaned))
+
+    net = {}
+    for _, cleaned in valid:
+        net[cleaned['item_id']] = net.get(cleaned['item_id'], 0) + stock_delta(cleaned['transaction_type'], cleaned['quantity'])
+
+    with transaction.atomic():
+        short = set()
+        # Items in id order, so concurrent batches lock rows in the same order
+        for item_id in sorted(net):
+            if not net[item_id]:
+                continue
+            try:
+                change_stock(item_id, net[item_id], allow_negative)
+            except InsufficientStock:
+                short.add(item_id)
+
+        posted = [(index, cleaned) for index, cleaned in valid if cleaned['item_id'] not in short]
+        movements = InventoryTransaction.objects.bulk_create(
+            [InventoryTransaction(
+                item_id=cleaned['item_id'],
+                transaction_type=cleaned['transaction_type'],
+                quantity=cleaned['quantity'],
+                remarks=cleaned['remarks'],
+            ) for _, cleaned in posted],
+            batch_size=1000,
+        )
+
+    for index, cleaned in valid:
+        if cleaned['item_id'] in short:
+            results[index] = {'index': index, 'status': 'failed', 'errors': [
+                f"Not enough stock of item {cleaned['item_id']} for this batch"
+            ]}
+    for (index, _), movement in zip(posted, movements):
+        results[index] = {'index': index, 'status': 'created', 'id': movement.id}
+    return results
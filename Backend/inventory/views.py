@@ -1,6 +1,10 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from .models import InventoryItem, InventoryTransaction
 from .serializers import InventoryItemSerializer, InventoryTransactionSerializer
+from .stock import InsufficientStock, allow_negative_default, post_movements
 
 class InventoryItemViewSet(viewsets.ModelViewSet):
     queryset = InventoryItem.objects.all()
@@ -10,3 +14,36 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
 class InventoryTransactionViewSet(viewsets.ModelViewSet):
     queryset = InventoryTransaction.objects.all()
     serializer_class = InventoryTransactionSerializer
+
+    def perform_create(self, serializer):
+        try:
+            serializer.save()
+        except InsufficientStock as e:
+            raise ValidationError({'quantity': str(e)})
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Post many movements in one transaction:
+            {"movements": [{"item": 3, "transaction_type": "OUT", "quantity": 40, "remarks": ""}, ...],
+             "allow_negative": false}
+        allow_negative defaults to the INVENTORY_ALLOW_NEGATIVE_STOCK setting. The response
+        reports each movement in request order and the resulting stock of the items involved.
+        """
+        entries = request.data.get('movements')
+        if not isinstance(entries, list) or not entries:
+            return Response({'error': 'movements must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        allow_negative = request.data.get('allow_negative')
+        if allow_negative is None:
+            allow_negative = allow_negative_default()
+        else:
+            allow_negative = str(allow_negative).lower() in ['true', '1', 'yes']
+
+        results = post_movements(entries, allow_negative=allow_negative)
+        created = sum(1 for r in results if r['status'] == 'created')
+        item_ids = {e.get('item') for e in entries if isinstance(e, dict)}
+        stock = InventoryItem.objects.filter(id__in=[i for i in item_ids if str(i).isdigit()]).order_by('id').values('id', 'name', 'quantity')
+        return Response(
+            {'created': created, 'failed': len(results) - created, 'results': results, 'stock': list(stock)},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from jobs.runner import run_worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (imports, reconciliation). Keeps polling until stopped unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+        parser.add_argument('--poll', type=float, default=2.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--stale-after', type=int, default=30,
+                            help="Minutes without a heartbeat before a running job is queued again")
+        parser.add_argument('--max-jobs', type=int, help="Exit after running this many jobs")
+
+    def handle(self, *args, **options):
+        try:
+            count = run_worker(
+                once=options['once'],
+                poll_interval=options['poll'],
+                stale_after=timedelta(minutes=options['stale_after']),
+                max_jobs=options['max_jobs'],
+                log=self.stdout.write,
+            )
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS(f"Ran {count} job(s)"))
@@ -0,0 +1,42 @@
+from django.db import models
+
+class Job(models.Model):
+    """
+    A piece of work run outside the request by `manage.py run_jobs`.
+    The queue is this table, so no broker is needed. See jobs/runner.py.
+    """
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50, help_text="Task name, see jobs/tasks.py")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    params = models.JSONField(default=dict, blank=True)
+    # The uploaded file for import jobs; cleared when the job finishes
+    payload = models.BinaryField(null=True, blank=True, editable=False)
+    payload_name = models.CharField(max_length=255, blank=True)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    # File produced by export jobs, served by /api/jobs/<id>/download/
+    output = models.BinaryField(null=True, blank=True, editable=False)
+    output_name = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest queued job; finished jobs are never scanned
+            models.Index(fields=['id'], condition=models.Q(status='QUEUED'), name='job_queued_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
@@ -0,0 +1,168 @@
+"""
+A small job queue on the app's own database.
+
+enqueue() inserts a QUEUED Job. Workers (`manage.py run_jobs`) claim the
+oldest one with SELECT ... FOR UPDATE SKIP LOCKED, so several workers can
+share the table without handing out the same job, run its task from
+jobs/tasks.py and store the result or the error. A job whose worker died is
+found by its stale heartbeat and queued again; the import and matching tasks
+are safe to repeat.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .tasks import TASKS
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+# Seconds between progress writes for one job
+PROGRESS_INTERVAL = 1.0
+# Seconds between heartbeats while a task runs, well inside the stale cutoff
+HEARTBEAT_INTERVAL = 60
+
+
+def enqueue(kind, params=None, payload=None, payload_name=''):
+    if kind not in TASKS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    return Job.objects.create(kind=kind, params=params or {}, payload=payload, payload_name=payload_name)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next(worker):
+    """Mark the oldest queued job as running for this worker and return it, or None if the queue is empty."""
+    while True:
+        with transaction.atomic():
+            job_id = Job.objects.select_for_update(skip_locked=True).filter(status='QUEUED').order_by('id').values_list(
+                'id', flat=True
+            ).first()
+            if job_id is None:
+                return None
+            now = timezone.now()
+            # SQLite has no row locks; the status check keeps two workers from both taking the job there
+            claimed = Job.objects.filter(id=job_id, status='QUEUED').update(
+                status='RUNNING', worker=worker, attempts=F('attempts') + 1, started_at=now, heartbeat_at=now,
+            )
+        if claimed:
+            return Job.objects.get(id=job_id)
+
+
+def requeue_stale(stale_after):
+    """Queue running jobs with no heartbeat for stale_after again, or fail them after MAX_ATTEMPTS. Returns the count."""
+    cutoff = timezone.now() - stale_after
+    stale = Job.objects.filter(status='RUNNING', heartbeat_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status='FAILED', error='The worker running this job stopped responding', payload=None, finished_at=timezone.now(),
+    )
+    return failed + stale.update(status='QUEUED', worker='')
+
+
+class ProgressReporter:
+    """
+    The progress callback handed to a task, which also keeps the job's
+    heartbeat going. Tasks write in one transaction, so updates are sent from
+    threads of their own (and so on connections of their own) to be visible
+    while the job runs. Progress is best effort: a write that fails is logged
+    and skipped.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.latest = (0, None)
+        self.last_write = 0.0
+        self.pending = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.stopped = threading.Event()
+        self.heartbeat = threading.Thread(target=self._beat, daemon=True)
+        self.heartbeat.start()
+
+    def __call__(self, done, total=None):
+        self.latest = (done, total)
+        now = time.monotonic()
+        # Coalesce: never more than one write queued, and at most one per interval
+        if now - self.last_write < PROGRESS_INTERVAL or (self.pending and not self.pending.done()):
+            return
+        self.last_write = now
+        self.pending = self.executor.submit(self._write, done, total)
+
+    def _write(self, done=None, total=None):
+        fields = {'heartbeat_at': timezone.now()}
+        if done is not None:
+            fields.update(progress_done=done, progress_total=total)
+        try:
+            Job.objects.filter(id=self.job_id).update(**fields)
+        except DatabaseError as e:
+            logger.warning("Could not record progress for job %s: %s", self.job_id, e)
+
+    def _beat(self):
+        while not self.stopped.wait(HEARTBEAT_INTERVAL):
+            self._write()
+        connection.close()
+
+    def close(self):
+        self.stopped.set()
+        self.heartbeat.join()
+        self.executor.submit(connection.close)
+        self.executor.shutdown(wait=True)
+
+
+def run_job(job):
+    """Run a claimed job to completion and record the outcome. Returns the final status."""
+    progress = ProgressReporter(job.id)
+    try:
+        result = TASKS[job.kind](job, progress)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job.id, job.kind)
+        outcome = {'status': 'FAILED', 'error': str(e) or e.__class__.__name__}
+    else:
+        outcome = {'status': 'SUCCEEDED', 'result': result}
+    finally:
+        progress.close()
+
+    done, total = progress.latest
+    if outcome['status'] == 'SUCCEEDED':
+        done = total = total or done
+    now = timezone.now()
+    Job.objects.filter(id=job.id).update(
+        progress_done=done, progress_total=total, payload=None, finished_at=now, heartbeat_at=now, **outcome
+    )
+    return outcome['status']
+
+
+def run_worker(worker=None, once=False, poll_interval=2.0, stale_after=timedelta(minutes=30), max_jobs=None, log=None):
+    """
+    Claim and run jobs until stopped. once=True returns as soon as the queue is
+    empty. Returns the number of jobs run.
+    """
+    worker = worker or worker_name()
+    log = log or logger.info
+    count = 0
+    while max_jobs is None or count < max_jobs:
+        close_old_connections()
+        requeued = requeue_stale(stale_after)
+        if requeued:
+            log(f"Requeued {requeued} stale job(s)")
+        job = claim_next(worker)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        start = time.perf_counter()
+        status = run_job(job)
+        count += 1
+        log(f"{job.kind} #{job.id}: {status} in {time.perf_counter() - start:.1f}s")
+    return count
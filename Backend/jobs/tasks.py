@@ -0,0 +1,67 @@
+"""
+Work the job queue can run. A task takes (job, progress) and returns the
+JSON body the synchronous endpoint would have answered with, which becomes
+job.result. progress(done, total=None) may be called as often as convenient;
+the runner throttles the writes.
+"""
+import io
+import tempfile
+
+from fees.exports import build_export, csv_chunks, parse_file_type, write_xlsx
+from fees.reconciliation import auto_match_unreconciled, import_statement, statement_summary
+from students.importer import import_students
+from .models import Job
+
+
+def _payload(job):
+    # BinaryField comes back as a memoryview on PostgreSQL
+    return io.BytesIO(bytes(job.payload or b''))
+
+
+def import_students_task(job, progress):
+    return import_students(_payload(job), progress=progress).summary()
+
+
+def import_statement_task(job, progress):
+    return statement_summary(import_statement(_payload(job), progress=progress))
+
+
+def auto_match_task(job, progress):
+    matched = auto_match_unreconciled()
+    return {'message': f'Successfully auto-matched {matched} entries', 'matched': matched}
+
+
+def export_task(job, progress):
+    params = job.params
+    export = build_export(params['export'], params)
+    file_type = parse_file_type(params)
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            if count % 1000 == 0:
+                progress(count)
+            yield row
+
+    export = export._replace(rows=counted(export.rows))
+    with tempfile.TemporaryFile() as fh:
+        if file_type == 'xlsx':
+            write_xlsx(export, fh)
+        else:
+            for chunk in csv_chunks(export):
+                fh.write(chunk.encode('utf-8'))
+        progress(count)
+        fh.seek(0)
+        name = f'{export.name}.{file_type}'
+        Job.objects.filter(id=job.id).update(output=fh.read(), output_name=name)
+    return {'message': f'Exported {count} rows', 'rows': count, 'file_name': name}
+
+
+TASKS = {
+    'import_students': import_students_task,
+    'import_statement': import_statement_task,
+    'auto_match': auto_match_task,
+    'export': export_task,
+}
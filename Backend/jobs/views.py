@@ -0,0 +1,40 @@
+import mimetypes
+
+from django.http import HttpResponse
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from .models import Job
+from .serializers import JobSerializer
+
+def async_requested(request):
+    """True for ?async=true: the endpoint should queue a job instead of doing the work in the request."""
+    return str(request.query_params.get('async', '')).lower() in ['true', '1', 'yes']
+
+def job_accepted(job):
+    return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Background jobs; poll /api/jobs/<id>/ for status, progress and the result."""
+    queryset = Job.objects.all().order_by('-id')
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        queryset = Job.objects.defer('payload', 'output').order_by('-id')
+        for field in ('status', 'kind'):
+            value = self.request.query_params.get(field)
+            if value:
+                queryset = queryset.filter(**{field: value})
+        return queryset
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """The file an export job produced."""
+        job = self.get_object()
+        output = Job.objects.filter(id=job.id).values_list('output', flat=True).first()
+        if output is None:
+            return Response({'error': 'This job has no file to download'}, status=status.HTTP_404_NOT_FOUND)
+        content_type = mimetypes.guess_type(job.output_name)[0] or 'application/octet-stream'
+        response = HttpResponse(bytes(output), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{job.output_name}"'
+        return response
@@ -0,0 +1,61 @@
+"""
+Sparse fieldsets: ?fields=id,name on list and retrieve.
+
+The serializer drops every field that was not asked for and the queryset
+loads only the matching columns with .only(), so a dropdown that needs ids
+and names does not pay for the rest of the row.
+"""
+from rest_framework import serializers
+
+
+class SparseFieldsetSerializerMixin:
+    """ModelSerializer mixin taking fields=[...] to keep only those fields."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """
+    ViewSet mixin reading ?fields= for list and retrieve. The serializer must
+    use SparseFieldsetSerializerMixin. Unknown field names are a 400.
+    """
+    fields_query_param = 'fields'
+
+    def get_requested_fields(self):
+        """The requested field names, or None for all of them."""
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = self._parse_requested_fields()
+        return self._requested_fields
+
+    def _parse_requested_fields(self):
+        if self.action not in ('list', 'retrieve'):
+            return None
+        value = self.request.query_params.get(self.fields_query_param)
+        if not value:
+            return None
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in self.get_serializer_class()().fields]
+        if unknown:
+            raise serializers.ValidationError({self.fields_query_param: f"Unknown field(s): {', '.join(unknown)}"})
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        if fields is not None:
+            serializer_fields = self.get_serializer_class()().fields
+            model_fields = {f.name for f in queryset.model._meta.concrete_fields}
+            # Serializer fields backed by a column; the primary key is always loaded
+            columns = {serializer_fields[name].source for name in fields} & model_fields
+            queryset = queryset.only(queryset.model._meta.pk.name, *columns)
+        return queryset
@@ -0,0 +1,90 @@
+"""
+Per-request timing.
+
+RequestTimingMiddleware counts SQL queries and DB time with a
+connection.execute_wrapper (no DEBUG query log needed) and splits the
+request into view and json-render time. DRF views build serializer.data
+before they return, so serializer time is part of view; json-render is only
+the renderer turning the finished data into bytes. The numbers go out in a Server-Timing
+header, which browser dev tools show under the request's Timing tab, and
+requests slower than SLOW_REQUEST_THRESHOLD_MS are logged together with
+their most repeated SQL so N+1 loops stand out.
+"""
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """execute_wrapper that keeps a count, total time and per-statement counts."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            # Parameters are kept out of the SQL, so the same query in a loop counts as one statement
+            self.statements[sql] += 1
+
+
+class RequestTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold_ms = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500)
+
+    def __call__(self, request):
+        request._timing = {'view_start': None, 'view_end': None}
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        end = time.perf_counter()
+
+        timing = request._timing
+        total_ms = (end - start) * 1000
+        metrics = [('db', recorder.duration * 1000, f'{recorder.count} queries')]
+        if timing['view_start'] is not None:
+            view_end = timing['view_end'] or end
+            metrics.append(('view', (view_end - timing['view_start']) * 1000, 'view'))
+            if timing['view_end'] is not None:
+                # DRF encodes the already serialized data as JSON after the view returns
+                metrics.append(('json-render', (end - timing['view_end']) * 1000, 'json render'))
+        metrics.append(('total', total_ms, 'total'))
+
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration:.1f};desc="{desc}"' for name, duration, desc in metrics
+        )
+
+        if total_ms >= self.threshold_ms:
+            self.log_slow_request(request, response, total_ms, recorder)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing['view_start'] = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Called between the view returning and the response being rendered
+        request._timing['view_end'] = time.perf_counter()
+        return response
+
+    def log_slow_request(self, request, response, total_ms, recorder):
+        repeated = [(sql, n) for sql, n in recorder.statements.most_common(5) if n > 1]
+        lines = [
+            f"Slow request {request.method} {request.get_full_path()} -> {response.status_code}: "
+            f"{total_ms:.0f}ms, {recorder.count} queries, {recorder.duration * 1000:.0f}ms in DB"
+        ]
+        for sql, n in repeated:
+            lines.append(f"  {n}x {sql[:300]}")
+        logger.warning('\n'.join(lines))
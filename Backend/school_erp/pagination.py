@@ -0,0 +1,70 @@
+"""
+Opt-in pagination.
+
+The frontend expects plain JSON arrays from list endpoints, so these classes
+only paginate when the client asks for it with ?cursor=, ?page= or ?page_size=.
+"""
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+
+
+class OptInCursorPagination(CursorPagination):
+    """
+    Cursor pagination on an indexed ordering: every page is a keyset query,
+    so latency stays flat however deep the client pages.
+    Subclasses set `ordering`.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class OptInPageNumberPagination(PageNumberPagination):
+    """Page-number pagination with a total count, for ?page= or ?page_size=."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class PageOrCursorPagination(BasePagination):
+    """
+    Either kind, chosen by the client: ?cursor= (or ?pagination=cursor for the
+    first page) pages by cursor, ?page= or ?page_size= by page number. Without
+    any of them the list is returned unpaginated. Subclasses may set
+    `ordering`, which must be unique for the cursor to be stable.
+    """
+    ordering = 'id'
+
+    def __init__(self):
+        self.cursor = CursorPagination()
+        self.cursor.ordering = self.ordering
+        self.cursor.page_size_query_param = 'page_size'
+        self.cursor.max_page_size = OptInPageNumberPagination.max_page_size
+        self.cursor.page_size = OptInPageNumberPagination.page_size
+        self.page_number = OptInPageNumberPagination()
+        self.active = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor.cursor_query_param in params or params.get('pagination') == 'cursor':
+            self.active = self.cursor
+        else:
+            self.active = self.page_number
+        return self.active.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number.get_paginated_response_schema(schema)
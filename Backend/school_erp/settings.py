@@ -64,6 +64,7 @@ INSTALLED_APPS = [
     'students',
     'fees',
     'inventory',
+    'jobs',
 ]
 
 # CORS Configuration - Use production frontend URL from .env
@@ -90,6 +91,7 @@ CORS_ALLOW_CREDENTIALS = True  # Required for session authentication
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'school_erp.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -209,6 +211,23 @@ if DEBUG:
     SESSION_COOKIE_SECURE = False
     SESSION_COOKIE_SAMESITE = 'Lax'
 
+# Cache used for report results (students/stats/). Local memory by default;
+# set CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache and
+# CACHE_LOCATION=/path/to/dir to share it between gunicorn workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'school-erp'),
+    }
+}
+RESULT_CACHE_TIMEOUT = int(os.getenv('RESULT_CACHE_TIMEOUT', 600))  # seconds
+
+# Set to false to reject stock movements that would take an item below zero (see inventory/stock.py)
+INVENTORY_ALLOW_NEGATIVE_STOCK = os.getenv('INVENTORY_ALLOW_NEGATIVE_STOCK', 'true').lower() == 'true'
+
+# Requests slower than this are logged with their most repeated SQL (see school_erp/middleware.py)
+SLOW_REQUEST_THRESHOLD_MS = int(os.getenv('SLOW_REQUEST_THRESHOLD_MS', 500))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -10,5 +10,6 @@ urlpatterns = [
     path('api/', include('students.urls')),
     path('api/fees/', include('fees.urls')),
     path('api/inventory/', include('inventory.urls')),
+    path('api/jobs/', include('jobs.urls')),
     path('', home), # Redirect root to admin
 ]
@@ -0,0 +1,189 @@
+"""
+Bulk student import from an .xlsx admission sheet.
+
+The workbook is streamed in openpyxl's read_only mode and students are
+written in chunks with one upsert each (bulk_create with update_conflicts on
+student_id), so an import costs a few queries per thousand rows instead of
+two per row. Transport heads are resolved from one prefetched dict.
+
+Column layout (first row is the header):
+    Student ID, Name, Class, Contact, Transport, Transport Head, Previous Pending, Previous Paid
+"""
+import io
+from decimal import Decimal, InvalidOperation
+
+import openpyxl
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from fees.aggregates import move_student_class
+from fees.models import FeeHead
+from fees.versions import FEE_DATA, STUDENTS, bump_versions_on_commit, student_ledger_key
+from .models import Student
+
+CHUNK_SIZE = 1000
+# Fields an import sets; everything else (status, admission flag) is kept on update
+IMPORT_FIELDS = ['name', 'student_class', 'contact_number', 'has_transport', 'transport_fee_head',
+                 'previous_pending', 'previous_paid']
+# Above this many class changes the daily collection summary is rebuilt instead of moved per student
+CLASS_MOVE_REBUILD_THRESHOLD = 50
+
+
+def transport_heads_by_name():
+    """{lower-cased name: FeeHead id} for transport heads. Heads are cloned per session, so the newest wins."""
+    return {
+        name.lower(): head_id
+        for head_id, name in FeeHead.objects.filter(is_transport_fee=True).order_by('id').values_list('id', 'name')
+    }
+
+
+def _text(value):
+    return str(value).strip() if value is not None else ''
+
+
+def _amount(value, field):
+    if value in (None, ''):
+        return Decimal('0')
+    try:
+        amount = Decimal(str(value).replace(',', '').strip())
+    except InvalidOperation:
+        raise ValidationError(f"{field} must be a number, got '{value}'")
+    Student._meta.get_field(field).run_validators(amount)
+    return amount
+
+
+def parse_row(values, transport_heads):
+    """A Student (unsaved) from one sheet row. Raises ValidationError with the reason."""
+    values = list(values) + [None] * (8 - len(values))
+    student = Student(
+        student_id=_text(values[0]),
+        name=_text(values[1]),
+        student_class=_text(values[2]),
+        contact_number=_text(values[3]),
+        has_transport=_text(values[4]).lower() in ['yes', 'true', '1', 'y'],
+        transport_fee_head_id=transport_heads.get(_text(values[5]).lower()) if _text(values[5]) else None,
+        previous_pending=_amount(values[6], 'previous_pending'),
+        previous_paid=_amount(values[7], 'previous_paid'),
+    )
+    if not student.name:
+        raise ValidationError("Name is required")
+    for field in ('student_id', 'name', 'student_class', 'contact_number'):
+        Student._meta.get_field(field).run_validators(getattr(student, field))
+    return student
+
+
+def _upsert(students, now):
+    for student in students:
+        student.created_at = student.updated_at = now
+    Student.objects.bulk_create(
+        students, update_conflicts=True, unique_fields=['student_id'], update_fields=IMPORT_FIELDS + ['updated_at'],
+    )
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        # student pk -> (class before the import, class after)
+        self.class_moves = {}
+        self.updated_ids = set()
+
+    def summary(self):
+        """The bulk_import response body."""
+        return {
+            'message': f'Import completed. Created: {self.created}, Updated: {self.updated}',
+            'created': self.created,
+            'updated': self.updated,
+            'errors': self.errors,
+        }
+
+
+def _write_chunk(rows, result, seen):
+    """rows: [(row number, Student)]. Upserts them, falling back to one row at a time if the chunk fails."""
+    # A student listed twice in a chunk keeps the last row, like the old row-by-row import
+    latest = {}
+    for row_number, student in rows:
+        latest[student.student_id] = (row_number, student)
+    existing = {
+        student_id: (pk, student_class)
+        for pk, student_id, student_class in Student.objects.filter(student_id__in=list(latest)).values_list(
+            'id', 'student_id', 'student_class'
+        )
+    }
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            _upsert([student for _, student in latest.values()], now)
+        written = list(latest.values())
+    except DatabaseError:
+        written = []
+        for row_number, student in latest.values():
+            try:
+                with transaction.atomic():
+                    _upsert([student], now)
+                written.append((row_number, student))
+            except DatabaseError as e:
+                result.errors.append(f"Row {row_number}: {e}")
+
+    written_ids = {student.student_id for _, student in written}
+    for _, student in rows:
+        if student.student_id not in written_ids:
+            continue
+        if student.student_id in existing or student.student_id in seen:
+            result.updated += 1
+        else:
+            result.created += 1
+        seen.add(student.student_id)
+    for student_id in written_ids & set(existing):
+        pk, old_class = existing[student_id]
+        result.updated_ids.add(pk)
+        # Keep the class from before the import if the student shows up in several chunks
+        before = result.class_moves.get(pk, (old_class,))[0]
+        result.class_moves[pk] = (before, latest[student_id][1].student_class)
+
+
+def import_students(file_obj, progress=None):
+    """
+    Import an admission sheet. Returns an ImportResult with counts and per-row errors.
+    progress(rows done, total rows) is called after each chunk when given.
+    """
+    workbook = openpyxl.load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        # From the sheet's dimension record, which not every writer fills in
+        total_rows = sheet.max_row - 1 if sheet.max_row else None
+        transport_heads = transport_heads_by_name()
+        result = ImportResult()
+        seen = set()
+        chunk = []
+        with transaction.atomic():
+            for row_number, values in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+                if not values or not values[0]:
+                    continue
+                try:
+                    chunk.append((row_number, parse_row(values, transport_heads)))
+                except ValidationError as e:
+                    result.errors.append(f"Row {row_number}: {' '.join(e.messages)}")
+                if len(chunk) >= CHUNK_SIZE:
+                    _write_chunk(chunk, result, seen)
+                    chunk = []
+                    if progress:
+                        progress(row_number - 1, total_rows)
+            if chunk:
+                _write_chunk(chunk, result, seen)
+
+            moves = {pk: (old, new) for pk, (old, new) in result.class_moves.items() if old != new}
+            if len(moves) > CLASS_MOVE_REBUILD_THRESHOLD:
+                call_command('rebuild_daily_collections', stdout=io.StringIO())
+            else:
+                for pk, (old_class, new_class) in moves.items():
+                    move_student_class(pk, old_class, new_class)
+            # bulk_create skips the post_save signals that normally bump these
+            if result.created or result.updated:
+                bump_versions_on_commit([FEE_DATA, STUDENTS] + [student_ledger_key(pk) for pk in result.updated_ids])
+    finally:
+        workbook.close()
+    return result
@@ -0,0 +1,73 @@
+import io
+import random
+import time
+
+import openpyxl
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from fees.synthetic import CLASSES, FIRST_NAMES, LAST_NAMES, seed_sessions
+from school_erp.middleware import QueryRecorder
+from students.importer import import_students
+from students.models import Student
+
+
+def student_workbook(rows, routes, rng, class_shift=0):
+    """An .xlsx in the bulk_import layout with rows students IMP000001..; class_shift moves everyone up."""
+    wb = openpyxl.Workbook(write_only=True)
+    sheet = wb.create_sheet()
+    sheet.append(['Student ID', 'Name', 'Class', 'Contact', 'Transport', 'Transport Head', 'Previous Pending', 'Previous Paid'])
+    for n in range(1, rows + 1):
+        route = rng.choice(routes) if rng.random() < 0.35 else None
+        sheet.append([
+            f'IMP{n:06d}',
+            f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            CLASSES[(n + class_shift) % len(CLASSES)],
+            f'9{rng.randrange(10 ** 9):09d}',
+            'yes' if route else 'no',
+            route,
+            rng.choice([0, 0, 500, 1500]),
+            0,
+        ])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Time bulk student imports in a throwaway test database: a first import that creates "
+        "every student and a re-import that updates them all."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='1000,10000,50000', help="Comma-separated workbook sizes")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        sizes = [int(n) for n in options['rows'].split(',') if n.strip()]
+        rng = random.Random(options['seed'])
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            heads = seed_sessions(['2026-27'])['2026-27']
+            routes = [h.name for h in heads if h.is_transport_fee]
+            for rows in sizes:
+                Student.objects.all().delete()
+                self.stdout.write(f"\n{rows} rows")
+                for label, class_shift in (('create', 0), ('update', 1)):
+                    workbook = student_workbook(rows, routes, rng, class_shift)
+                    recorder = QueryRecorder()
+                    with connection.execute_wrapper(recorder):
+                        start = time.perf_counter()
+                        result = import_students(workbook)
+                        elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f"  {label:<7} {elapsed:>7.2f}s  {rows / elapsed:>9.0f} rows/s  {recorder.count:>5} queries  "
+                        f"created {result.created}, updated {result.updated}, errors {len(result.errors)}"
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
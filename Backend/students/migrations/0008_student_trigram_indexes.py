@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:05
+
+from django.db import DatabaseError, migrations, transaction
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Autocomplete falls back to an in-process index on other databases (see students/search.py)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError:
+        # Not allowed to install extensions on this server: keep the fallback
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS student_name_trgm_idx ON students_student USING gin (UPPER(name) gin_trgm_ops)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS student_id_trgm_idx ON students_student USING gin (UPPER(student_id) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS student_name_trgm_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS student_id_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0007_student_previous_paid_student_previous_pending'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -1,25 +1,30 @@
 from django.db import models
 
+CLASS_CHOICES = [
+    ('Nursery', 'Nursery'),
+    ('KG1', 'KG1'),
+    ('KG2', 'KG2'),
+    ('Class 1', 'Class 1'),
+    ('Class 2', 'Class 2'),
+    ('Class 3', 'Class 3'),
+    ('Class 4', 'Class 4'),
+    ('Class 5', 'Class 5'),
+    ('Class 6', 'Class 6'),
+    ('Class 7', 'Class 7'),
+    ('Class 8', 'Class 8'),
+    ('Class 9', 'Class 9'),
+    ('Class 10', 'Class 10'),
+    ('Class 11', 'Class 11'),
+    ('Class 12', 'Class 12'),
+]
+# Classes from the first to the last, used for promotion and for sorting by class
+CLASS_ORDER = [value for value, _ in CLASS_CHOICES]
+
+
 class Student(models.Model):
     name = models.CharField(max_length=200)
     student_id = models.CharField(max_length=20, unique=True, help_text="Unique Registration/Roll Number")
-    student_class = models.CharField(max_length=20, choices=[
-        ('Nursery', 'Nursery'),
-        ('KG1', 'KG1'),
-        ('KG2', 'KG2'),
-        ('Class 1', 'Class 1'),
-        ('Class 2', 'Class 2'),
-        ('Class 3', 'Class 3'),
-        ('Class 4', 'Class 4'),
-        ('Class 5', 'Class 5'),
-        ('Class 6', 'Class 6'),
-        ('Class 7', 'Class 7'),
-        ('Class 8', 'Class 8'),
-        ('Class 9', 'Class 9'),
-        ('Class 10', 'Class 10'),
-        ('Class 11', 'Class 11'),
-        ('Class 12', 'Class 12'),
-    ])
+    student_class = models.CharField(max_length=20, choices=CLASS_CHOICES)
     has_transport = models.BooleanField(default=False)
     is_new_admission = models.BooleanField(default=False)
     contact_number = models.CharField(max_length=15, null=True, blank=True)
@@ -0,0 +1,164 @@
+"""
+Student autocomplete for the student list and the fee counter.
+
+Every query word has to match the start of a word of the name or of the
+student id. Results are ranked: exact student id, then student id prefix,
+then name prefix, then any other word match, with active students before
+TC. Within a rank the closest name comes first.
+
+On PostgreSQL with pg_trgm (see migration 0008) the search runs in the
+database on trigram GIN indexes. Elsewhere it uses an in-process prefix
+index over all students that is rebuilt when the students version moves
+(see fees/versions.py), the same way the fee schedule is cached.
+"""
+import heapq
+import threading
+from bisect import bisect_left
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from fees.versions import STUDENTS, get_version
+from .models import Student
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+RESULT_FIELDS = ['id', 'name', 'student_class', 'student_id']
+
+# Rank of a match in the database search; lower is better
+EXACT_ID, ID_PREFIX, NAME_PREFIX, WORD_PREFIX = range(4)
+
+
+def query_words(q):
+    return (q or '').lower().split()
+
+
+class PrefixIndex:
+    """
+    Sorted keys over all students: full names, student ids and every word of
+    either. The rows matching a prefix are a slice found with two bisects.
+    Rows are numbered in their order within a rank (active first, shortest
+    name, name, id), so ranking a slice is just taking its smallest numbers.
+    """
+
+    def __init__(self, students, version):
+        self.version = version
+        rows = sorted(
+            (status == 'TC', len(name), name.lower(), student_id.lower(), pk, name, student_class, student_id)
+            for pk, name, student_class, student_id, status in students
+        )
+        self.results = [dict(zip(RESULT_FIELDS, row[4:])) for row in rows]
+        self.names, self.name_rows = self._sorted_keys((row[2], r) for r, row in enumerate(rows))
+        self.ids, self.id_rows = self._sorted_keys((row[3], r) for r, row in enumerate(rows))
+        self.words, self.word_rows = self._sorted_keys(
+            (word, r) for r, row in enumerate(rows) for word in set(row[2].split()) | {row[3]}
+        )
+        self.row_words = [row[2].split() + [row[3]] for row in rows]
+
+    @staticmethod
+    def _sorted_keys(pairs):
+        pairs = sorted(pairs)
+        return [key for key, _ in pairs], [row for _, row in pairs]
+
+    @staticmethod
+    def _prefixed(keys, rows, prefix):
+        return rows[bisect_left(keys, prefix):bisect_left(keys, prefix + '\uffff')]
+
+    def search(self, words, limit):
+        q = ' '.join(words)
+        # Rows matching every word: start from the rarest word and check the others row by row
+        ranges = [(self._prefixed(self.words, self.word_rows, w), w) for w in words]
+        ranges.sort(key=lambda r: len(r[0]))
+        candidates, others = set(ranges[0][0]), [w for _, w in ranges[1:]]
+        if others:
+            candidates = {
+                r for r in candidates
+                if all(any(word.startswith(w) for word in self.row_words[r]) for w in others)
+            }
+
+        found, taken = [], set()
+
+        def take(rows):
+            for r in rows:
+                if len(found) == limit:
+                    return
+                if r not in taken:
+                    taken.add(r)
+                    found.append(self.results[r])
+
+        # Student id prefix in id order (so an exact id comes first), then name prefix,
+        # then any other word match. Every tier is a subset of the candidates.
+        take(self._prefixed(self.ids, self.id_rows, q))
+        take(heapq.nsmallest(limit, self._prefixed(self.names, self.name_rows, q)))
+        take(heapq.nsmallest(limit + len(taken), candidates))
+        return found
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_prefix_index():
+    """The worker's prefix index, rebuilt if the students version moved on."""
+    global _index
+    version = get_version(STUDENTS)
+    index = _index
+    if index is None or index.version != version:
+        index = PrefixIndex(
+            Student.objects.order_by('id').values_list('id', 'name', 'student_class', 'student_id', 'status'), version
+        )
+        with _lock:
+            _index = index
+    return index
+
+
+_trigram_available = None
+
+
+def trigram_available():
+    """True on PostgreSQL with the pg_trgm extension installed; checked once per worker."""
+    global _trigram_available
+    if _trigram_available is None:
+        _trigram_available = False
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                _trigram_available = cursor.fetchone() is not None
+    return _trigram_available
+
+
+def trigram_search(words, limit):
+    # Imported here: django.contrib.postgres needs the PostgreSQL driver
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    q = ' '.join(words)
+    students = Student.objects.all()
+    for word in words:
+        # Each is UPPER(column) LIKE ..., which the UPPER(column) gin_trgm_ops indexes serve
+        students = students.filter(
+            Q(student_id__istartswith=word) | Q(name__istartswith=word) | Q(name__icontains=f' {word}')
+        )
+    rank = Case(
+        When(student_id__iexact=q, then=Value(EXACT_ID)),
+        When(student_id__istartswith=q, then=Value(ID_PREFIX)),
+        When(name__istartswith=q, then=Value(NAME_PREFIX)),
+        default=Value(WORD_PREFIX),
+        output_field=IntegerField(),
+    )
+    is_tc = Case(When(status='TC', then=Value(1)), default=Value(0), output_field=IntegerField())
+    return list(
+        students.annotate(rank=rank, is_tc=is_tc, similarity=TrigramSimilarity('name', q))
+        .order_by('rank', 'is_tc', '-similarity', 'name', 'student_id')
+        .values(*RESULT_FIELDS)[:limit]
+    )
+
+
+def autocomplete(q, limit=DEFAULT_LIMIT):
+    """Up to limit ranked {id, name, student_class, student_id} dicts for the query."""
+    words = query_words(q)
+    if not words:
+        return []
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    if trigram_available():
+        return trigram_search(words, limit)
+    return get_prefix_index().search(words, limit)
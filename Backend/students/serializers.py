@@ -1,7 +1,8 @@
 from rest_framework import serializers
+from school_erp.fieldsets import SparseFieldsetSerializerMixin
 from .models import Student
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = '__all__'
@@ -0,0 +1,37 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from fees.synthetic import clear_school, seed_school
+
+SESSION = '2026-27'
+
+
+class ReportQueryCountTests(TestCase):
+    """stats and pending_fees must cost the same number of queries however many students there are."""
+
+    def query_count(self, url, students):
+        clear_school()
+        seed_school(students=students, sessions=(SESSION,))
+        # Warm the fee schedule and engine caches, then measure without the result cache
+        self.assertEqual(self.client.get(url).status_code, 200)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url):
+        small = self.query_count(url, 20)
+        large = self.query_count(url, 60)
+        self.assertEqual(small, large)
+
+    def test_stats_query_count(self):
+        self.assertConstantQueries(f'/api/students/stats/?session={SESSION}')
+
+    def test_stats_class_filter_query_count(self):
+        self.assertConstantQueries(f'/api/students/stats/?session={SESSION}&student_class=Class%205')
+
+    def test_pending_fees_query_count(self):
+        self.assertConstantQueries(f'/api/students/pending_fees/?session={SESSION}&show_all=true')
@@ -1,17 +1,35 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.parsers import MultiPartParser
-import openpyxl
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Sum, Q, Max
+from django.db import transaction
+from django.db.models import Sum, Q, Max, Count
 from .models import Student
 from .serializers import StudentSerializer
-from fees.models import FeeHead, FeeTransaction, FeeAmount, GlobalFeeSetting, StudentFeeEnrollment
+from .importer import import_students
+from .search import DEFAULT_LIMIT, autocomplete
+from jobs.runner import enqueue
+from jobs.views import async_requested, job_accepted
+from fees.models import DailyCollectionSummary, FeeHead, FeeTransaction, GlobalFeeSetting, StudentFeeEnrollment, StudentFeePaidTotal
+from fees.aggregates import move_student_class
+from fees.ledger import student_ledger
+from fees.schedule import get_fee_schedule
+from fees.engine import get_fee_engine
+from fees.pending import pending_fee_details
+from fees.money import from_paise, paise_expr
+from fees.result_cache import cached_result, cache_counters
+from fees.versions import FEE_SCHEDULE, STUDENTS, student_ledger_key
+from fees.conditional import ConditionalGetMixin, conditional_get
+from school_erp.fieldsets import SparseFieldsetViewMixin
+from school_erp.pagination import PageOrCursorPagination
 from datetime import datetime
 
-class StudentViewSet(viewsets.ModelViewSet):
-    queryset = Student.objects.all()
+class StudentViewSet(ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    # Lists are unpaginated unless the client asks (?page=, ?page_size=, ?cursor=) and take ?fields=id,name
+    queryset = Student.objects.all().order_by('id')
     serializer_class = StudentSerializer
+    pagination_class = PageOrCursorPagination
+    conditional_version_keys = [STUDENTS]
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'student_id']
     filterset_fields = ['student_class']
@@ -25,90 +43,109 @@ class StudentViewSet(viewsets.ModelViewSet):
             date_from = request.query_params.get('date_from')
             date_to = request.query_params.get('date_to', datetime.now().strftime('%Y-%m-%d'))
 
-            # 1. Fetch Students
-            students_qs = Student.objects.all()
-            if student_class:
-                students_qs = students_qs.filter(student_class=student_class)
-            
-            # Use values to speed up base stats
-            student_list = list(students_qs.values('id', 'student_class', 'status', 'has_transport', 'transport_fee_head_id'))
-            
-            total_students = len(student_list)
-            active_count = sum(1 for s in student_list if s['status'] == 'Active')
-            tc_count = sum(1 for s in student_list if s['status'] == 'TC')
-
-            # 2. Fetch Global Settings
-            global_settings = GlobalFeeSetting.objects.filter(session=session).first()
-            g_inst_count = global_settings.installment_count if global_settings else 1
-            if g_inst_count == 0: g_inst_count = 1
-
-            # 3. Fetch All Fee Heads for the session
-            heads = list(FeeHead.objects.filter(session=session))
-            
-            # 4. Bulk Fetch Fee Amounts
-            amounts_qs = FeeAmount.objects.filter(fee_head__in=heads)
-            amounts_map = {(a.fee_head_id, a.class_name): float(a.amount) for a in amounts_qs}
-
-            # 5. Bulk Fetch Transactions (Filtered by date/installment if needed)
-            transactions_qs = FeeTransaction.objects.filter(fee_head__in=heads)
-            if student_class:
-                transactions_qs = transactions_qs.filter(student__student_class=student_class)
-            if date_from:
-                transactions_qs = transactions_qs.filter(payment_date__gte=date_from)
-            if date_to:
-                transactions_qs = transactions_qs.filter(payment_date__lte=date_to)
-            if installment:
-                transactions_qs = transactions_qs.filter(installment_number=installment)
-
-            total_collected = float(transactions_qs.aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0)
-
-            # 6. Bulk Fetch Enrollments (Opt-Outs) - Only needed if we want perfect accuracy for "Expected"
-            # For stats, we might simplify or be precise. Let's be precise.
-            enrollments_qs = StudentFeeEnrollment.objects.filter(session=session)
-            # Map: (student_id, fee_head_id, installment_number) -> is_enrolled
-            enroll_map = {(e.student_id, e.fee_head_id, e.installment_number): e.is_enrolled for e in enrollments_qs}
-
-            # 7. Calculate "Expected" in memory
-            total_expected = 0
-            for s in student_list:
-                # Get heads applicable to this class
-                for h in heads:
-                    amt = amounts_map.get((h.id, s['student_class']))
-                    if amt is None: continue
-                    
-                    # Transport logic
-                    if h.is_transport_fee and (not s['has_transport'] or s['transport_fee_head_id'] != h.id):
-                        continue
-                    
-                    inst_count = 1 if h.frequency == 'ONCE' else g_inst_count
-                    
-                    # If specific installment requested
-                    if installment:
-                        target_inst = int(installment)
-                        if target_inst <= inst_count:
-                            if enroll_map.get((s['id'], h.id, target_inst), True):
-                                total_expected += (amt / inst_count)
-                    else:
-                        # Sum all valid installments
-                        for i in range(1, inst_count + 1):
-                            if enroll_map.get((s['id'], h.id, i), True):
-                                total_expected += (amt / inst_count)
-            
-            total_pending = float(total_expected) - total_collected
-
-            return Response({
-                'total_students': total_students,
-                'active_students': active_count,
-                'tc_students': tc_count,
-                'total_collected': total_collected,
-                'total_pending': max(0, total_pending), # Prevent negative due to overpayments
-            })
+            # Cached per filter combination until any fee data changes
+            payload = cached_result(
+                'stats',
+                (session, student_class, installment, date_from, date_to),
+                lambda: self._stats_payload(session, student_class, installment, date_from, date_to),
+            )
+            return Response(payload)
         except Exception as e:
             import traceback
             print(f"Error in stats: {str(e)}")
             print(traceback.format_exc())
             return Response({'error': str(e)}, status=500)
 
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Ranked matches for the search box: ?q=<name or student id words>&limit=10 (see students/search.py)"""
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(autocomplete(request.query_params.get('q'), limit))
+
+    @action(detail=False, methods=['get'])
+    def stats_cache(self, request):
+        """Hit/miss counters for the stats result cache"""
+        return Response(cache_counters('stats'))
+
+    def _stats_payload(self, session, student_class, installment, date_from, date_to):
+        # 1. Fetch Students
+        students_qs = Student.objects.all()
+        if student_class:
+            students_qs = students_qs.filter(student_class=student_class)
+        
+        # Status counts in a single aggregate query
+        counts = students_qs.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(status='Active')),
+            tc=Count('id', filter=Q(status='TC')),
+        )
+        total_students = counts['total']
+        active_count = counts['active']
+        tc_count = counts['tc']
+
+        # Students grouped into cohorts that share the same applicable fees
+        cohorts = list(
+            students_qs.values('student_class', 'has_transport', 'transport_fee_head_id')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+
+        # 2-4. Compiled fee schedule (settings, heads and per-class amounts) for the session
+        schedule = get_fee_schedule(session)
+
+        # 5. Collected amount from the pre-aggregated daily summary (Filtered by date/installment if needed)
+        collections_qs = DailyCollectionSummary.objects.filter(session=session)
+        if student_class:
+            collections_qs = collections_qs.filter(student_class=student_class)
+        if date_from:
+            collections_qs = collections_qs.filter(date__gte=date_from)
+        if date_to:
+            collections_qs = collections_qs.filter(date__lte=date_to)
+        if installment:
+            collections_qs = collections_qs.filter(installment_number=installment)
+
+        total_collected = collections_qs.aggregate(total=Sum(paise_expr('amount')))['total'] or 0
+
+        # 6. Opt-Outs counted per cohort, head and installment (students are enrolled unless opted out)
+        opt_outs = (
+            StudentFeeEnrollment.objects.filter(session=session, is_enrolled=False, student__in=students_qs)
+            .values('student__student_class', 'student__has_transport', 'student__transport_fee_head_id',
+                    'fee_head_id', 'installment_number')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+        # Map: (student_class, has_transport, transport_fee_head_id, fee_head_id, installment_number) -> opted out count
+        opt_out_map = {
+            (o['student__student_class'], o['student__has_transport'], o['student__transport_fee_head_id'],
+             o['fee_head_id'], o['installment_number']): o['n']
+            for o in opt_outs
+        }
+
+        # 7. Calculate "Expected" per cohort with the fee engine (cohort size is the row weight)
+        engine = get_fee_engine(schedule)
+        cohort_index = {(c['student_class'], c['has_transport'], c['transport_fee_head_id']): r for r, c in enumerate(cohorts)}
+        dues = engine.compute(
+            [c['student_class'] for c in cohorts],
+            [c['has_transport'] for c in cohorts],
+            [c['transport_fee_head_id'] for c in cohorts],
+            opt_outs=((cohort_index[key[:3]], key[3], key[4], n) for key, n in opt_out_map.items()),
+            weights=[c['n'] for c in cohorts],
+        )
+        total_expected = int(dues.expected(int(installment) if installment else None).sum())
+        
+        total_pending = total_expected - total_collected
+
+        return {
+            'total_students': total_students,
+            'active_students': active_count,
+            'tc_students': tc_count,
+            'total_collected': from_paise(total_collected),
+            'total_pending': from_paise(max(0, total_pending)), # Prevent negative due to overpayments
+        }
+
     @action(detail=False, methods=['get'])
     def pending_fees(self, request):
         try:
@@ -124,103 +161,27 @@ class StudentViewSet(viewsets.ModelViewSet):
             if student_id_param:
                 students = students.filter(id=student_id_param)
             
-            # 2. Fetch Global Settings
-            global_settings = GlobalFeeSetting.objects.filter(session=session).first()
-            g_inst_count = global_settings.installment_count if global_settings else 1
-            if g_inst_count == 0: g_inst_count = 1
-
-            # 3. Fetch All Fee Heads for the session
-            heads_qs = FeeHead.objects.filter(session=session)
-            heads = list(heads_qs) # Force evaluation once
-            head_ids = [h.id for h in heads]
-            
-            # 4. Bulk Fetch Fee Amounts
-            amounts_qs = FeeAmount.objects.filter(fee_head__in=heads)
-            # Map: (fee_head_id, class_name) -> amount
-            amounts_map = {(a.fee_head_id, a.class_name): float(a.amount) for a in amounts_qs}
-
-            # 5. Bulk Fetch Transactions
-            transactions_qs = FeeTransaction.objects.filter(student__in=students, fee_head__in=heads)
-            # Map: (student_id, fee_head_id, installment_number) -> total_paid
-            trans_map = {}
-            for t in transactions_qs:
-                key = (t.student_id, t.fee_head_id, t.installment_number)
-                trans_map[key] = trans_map.get(key, 0) + float(t.amount_paid)
-
-            # 6. Bulk Fetch Enrollments (Opt-Outs)
-            enrollments_qs = StudentFeeEnrollment.objects.filter(student__in=students, fee_head__in=heads, session=session)
-            # Map: (student_id, fee_head_id, installment_number) -> is_enrolled
-            enroll_map = {(e.student_id, e.fee_head_id, e.installment_number): e.is_enrolled for e in enrollments_qs}
-
-            fee_detail_list = []
-            
-            # Convert students to list to prevent re-querying count etc
-            student_list = list(students)
-
-            for student in student_list:
-                # Pre-filter heads applicable to this class in memory
-                student_class_heads = [h for h in heads if (h.id, student.student_class) in amounts_map]
-                
-                total_expected = 0
-                total_paid = 0
-                
-                installment_data = {i: {'heads': {}} for i in range(1, g_inst_count + 1)}
-
-                for head in student_class_heads:
-                    try:
-                        # Transport logic
-                        if head.is_transport_fee and (not student.has_transport or student.transport_fee_head_id != head.id):
-                            continue
-
-                        total_amt = amounts_map.get((head.id, student.student_class), 0)
-                        if total_amt == 0: continue
-
-                        inst_count = 1 if head.frequency == 'ONCE' else g_inst_count
-                        if inst_count <= 0: inst_count = 1
-                        
-                        inst_amt = total_amt / inst_count
-                        
-                        display_name = "Transportation Fees" if head.is_transport_fee else head.name
-
-                        for i in range(1, inst_count + 1):
-                            target_inst = i
-                            
-                            # Check enrollment (Default is True if no record)
-                            is_enrolled = enroll_map.get((student.id, head.id, i), True)
-                            if not is_enrolled:
-                                continue
-                            
-                            total_expected += inst_amt
-                            
-                            # Get paid amount from map
-                            paid_amt = trans_map.get((student.id, head.id, i), 0)
-                            total_paid += paid_amt
-                            
-                            if target_inst not in installment_data:
-                                installment_data[target_inst] = {'heads': {}}
-                                
-                            if display_name not in installment_data[target_inst]['heads']:
-                                installment_data[target_inst]['heads'][display_name] = {'due': 0, 'paid': 0, 'pending': 0}
-                                
-                            installment_data[target_inst]['heads'][display_name]['due'] += inst_amt
-                            installment_data[target_inst]['heads'][display_name]['paid'] += paid_amt
-                            installment_data[target_inst]['heads'][display_name]['pending'] += (inst_amt - paid_amt)
-                    except Exception as inner_e:
-                        print(f"Skipping head {head.name} for student {student.name}: {str(inner_e)}")
-                        continue
-                
-                balance = total_expected - total_paid
-                if show_all or balance > 0.01: # Small float margin
-                    fee_detail_list.append({
-                        'id': student.id,
-                        'student_id': student.student_id,
-                        'name': student.name,
-                        'student_class': student.student_class,
-                        'total_due': round(total_expected, 2),
-                        'total_paid': round(total_paid, 2),
-                        'pending_amount': round(balance, 2),
-                        'installment_data': installment_data
-                    })
+            # 2-4. Compiled fee schedule (settings, heads and per-class amounts) for the session
+            schedule = get_fee_schedule(session)
+            head_ids = schedule.head_ids
+
+            # 5. Bulk Fetch Paid Totals (maintained per student/head/installment on every receipt write)
+            paid_rows = StudentFeePaidTotal.objects.filter(student__in=students, fee_head_id__in=head_ids).annotate(
+                paid_paise=paise_expr('amount_paid')
+            ).values_list('student_id', 'fee_head_id', 'installment_number', 'paid_paise')
+
+            # 6. Bulk Fetch Enrollments (Opt-Outs only, enrolled is the default)
+            opt_out_rows = StudentFeeEnrollment.objects.filter(
+                student__in=students, fee_head_id__in=head_ids, session=session, is_enrolled=False
+            ).values_list('student_id', 'fee_head_id', 'installment_number')
+
+            # 7. Dues per student, head and installment computed as arrays by the fee engine
+            student_list = list(students.values(
+                'id', 'student_id', 'name', 'student_class', 'has_transport', 'transport_fee_head_id'
+            ))
+            fee_detail_list = pending_fee_details(
+                schedule, student_list, paid_rows, opt_out_rows, show_all=show_all
+            )
             
             fee_detail_list.sort(key=lambda x: x['pending_amount'], reverse=True)
             return Response(fee_detail_list)
@@ -233,6 +194,15 @@ class StudentViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def ledger(self, request, pk=None):
+        # 304 before the student or the ledger is loaded when the client's copy is still current
+        return conditional_get(
+            request,
+            [student_ledger_key(pk), FEE_SCHEDULE],
+            lambda: self._ledger_response(request),
+            extra=(datetime.now().strftime('%Y-%m-%d'),),
+        )
+
+    def _ledger_response(self, request):
         student = self.get_object()
         session = request.query_params.get('session')
         
@@ -241,59 +211,14 @@ class StudentViewSet(viewsets.ModelViewSet):
             latest_setting = GlobalFeeSetting.objects.all().order_by('-session').first()
             session = latest_setting.session if latest_setting else datetime.now().strftime('%Y-%m-%d')[:4] # fallback
 
-        heads = FeeHead.objects.all()
-        if session:
-            heads = heads.filter(session=session)
-        
-        applicable_heads = heads.filter(amounts__class_name=student.student_class)
-        
-        entries = []
-        # Debits: Fee assignments - Group as "All" per head
-        for head in applicable_heads:
-            if head.is_transport_fee and (not student.has_transport or student.transport_fee_head_id != head.id):
-                continue
-
-            try:
-                amt = float(FeeAmount.objects.get(fee_head=head, class_name=student.student_class).amount)
-                display_name = "Transportation Fees" if head.is_transport_fee else head.name
-                entries.append({
-                    'date': datetime.now().strftime('%Y-%m-%d'),
-                    'description': f"Fee Assigned: {display_name}",
-                    'installment': 'All',
-                    'debit': amt,
-                    'credit': 0,
-                })
-            except FeeAmount.DoesNotExist:
-                continue
-        
-        # Credits: Payments
-        transactions = FeeTransaction.objects.filter(student=student, fee_head__in=applicable_heads).order_by('payment_date')
-        for t in transactions:
-            display_name = "Transportation Fees" if t.fee_head and t.fee_head.is_transport_fee else (t.fee_head.name if t.fee_head else 'General')
-            entries.append({
-                'date': t.payment_date.strftime('%Y-%m-%d'),
-                'description': f"Payment: {display_name}",
-                'installment': t.installment_number,
-                'debit': 0,
-                'credit': float(t.amount_paid),
-            })
-        
-        # Sort by date then installment
-        def sort_key(x):
-            try:
-                inst = int(x['installment'])
-            except:
-                inst = 0 # 'All' or other strings come first
-            return (x['date'], inst)
-            
-        entries.sort(key=sort_key)
-        
-        # Calculate running sum
-        running_sum = 0
-        for entry in entries:
-            running_sum += (entry['debit'] - entry['credit'])
-            entry['balance'] = running_sum
-
+        schedule = get_fee_schedule(session)
+        # Shared by ledger and print_ledger until this student's payments or the schedule change
+        entries = cached_result(
+            'ledger',
+            (student.id, session, schedule.version, datetime.now().strftime('%Y-%m-%d')),
+            lambda: student_ledger(schedule, student),
+            version_key=student_ledger_key(student.id),
+        )
         return Response(entries)
     
     @action(detail=True, methods=['get'])
@@ -309,62 +234,16 @@ class StudentViewSet(viewsets.ModelViewSet):
         if not file_obj:
             return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
         
+        if async_requested(request):
+            return job_accepted(enqueue('import_students', payload=file_obj.read(), payload_name=file_obj.name))
+
         try:
-            wb = openpyxl.load_workbook(file_obj)
-            sheet = wb.active
-            
-            # Use list(sheet.iter_rows(min_row=2)) to skip header
-            created_count = 0
-            updated_count = 0
-            errors = []
-            
-            for row in sheet.iter_rows(min_row=2):
-                if not row[0].value: continue
-                
-                try:
-                    s_id = str(row[0].value).strip()
-                    name = str(row[1].value).strip()
-                    s_class = str(row[2].value).strip()
-                    contact = str(row[3].value).strip() if row[3].value else ""
-                    has_trans_str = str(row[4].value).strip().lower() if row[4].value else ""
-
-                    trans_head_name = str(row[5].value).strip() if row[5].value else None
-                    prev_pending = float(row[6].value) if (len(row) > 6 and row[6].value) else 0.0
-                    prev_paid = float(row[7].value) if (len(row) > 7 and row[7].value) else 0.0
-                    
-                    has_transport = has_trans_str in ['yes', 'true', '1', 'y']
-                    
-                    trans_head = None
-                    if trans_head_name:
-                        trans_head = FeeHead.objects.filter(name__iexact=trans_head_name, is_transport_fee=True).first()
-                    
-                    student, created = Student.objects.update_or_create(
-                        student_id=s_id,
-                        defaults={
-                            'name': name,
-                            'student_class': s_class,
-                            'contact_number': contact,
-                            'has_transport': has_transport,
-                            'transport_fee_head': trans_head,
-                            'previous_pending': prev_pending,
-                            'previous_paid': prev_paid
-                        }
-                    )
-                    
-                    if created: created_count += 1
-                    else: updated_count += 1
-                except Exception as row_error:
-                    errors.append(f"Row {row[0].row}: {str(row_error)}")
-                
-            return Response({
-                'message': f'Import completed. Created: {created_count}, Updated: {updated_count}',
-                'created': created_count,
-                'updated': updated_count,
-                'errors': errors
-            })
+            result = import_students(file_obj)
         except Exception as e:
             return Response({'error': f"Failed to parse Excel file: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
 
+        return Response(result.summary())
+
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
@@ -372,25 +251,18 @@ class StudentViewSet(viewsets.ModelViewSet):
         # Check if status is being changed to TC
         new_status = request.data.get('status')
         if new_status == 'TC' and instance.status != 'TC':
-            # Check for dues
-            heads = FeeHead.objects.all()
-            applicable_heads = heads.filter(amounts__class_name=instance.student_class)
+            # Check for dues across every session's fee schedule
             total_expected = 0
-            for head in applicable_heads:
-                if head.is_transport_fee and not instance.has_transport: continue
-                if head.is_transport_fee and instance.transport_fee_head_id != head.id: continue
-                
-                try:
-                    amt = FeeAmount.objects.get(fee_head=head, class_name=instance.student_class).amount
-                    total_expected += amt
-                except FeeAmount.DoesNotExist:
-                    continue
+            for session in FeeHead.objects.values_list('session', flat=True).distinct().order_by('session'):
+                schedule = get_fee_schedule(session)
+                for head in schedule.heads_for(instance.student_class, instance.has_transport, instance.transport_fee_head_id):
+                    total_expected += head.amounts[instance.student_class]
             
-            total_paid = FeeTransaction.objects.filter(student=instance).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
+            total_paid = FeeTransaction.objects.filter(student=instance).aggregate(total=Sum(paise_expr('amount_paid')))['total'] or 0
             balance = total_expected - total_paid
             
             if balance > 0:
-                return Response({'error': f'Cannot mark as TC. Student has pending dues: {balance}'}, status=status.HTTP_400_BAD_REQUEST)
+                return Response({'error': f'Cannot mark as TC. Student has pending dues: {from_paise(balance)}'}, status=status.HTTP_400_BAD_REQUEST)
 
         return super().update(request, *args, **kwargs)
 
@@ -398,6 +270,13 @@ class StudentViewSet(viewsets.ModelViewSet):
         kwargs['partial'] = True
         return self.update(request, *args, **kwargs)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        old_class = serializer.instance.student_class
+        student = serializer.save()
+        if student.student_class != old_class:
+            move_student_class(student.id, old_class, student.student_class)
+
     @action(detail=True, methods=['post'])
     def manage_enrollment(self, request, pk=None):
         """
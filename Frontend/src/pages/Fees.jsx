@@ -112,7 +112,8 @@ function Fees() {
 
     const fetchStudents = async () => {
         try {
-            const response = await api.get('students/');
+            // Only what the search list and the payment panel use
+            const response = await api.get('students/?fields=id,name,student_id,student_class,is_new_admission,previous_pending,previous_paid,transport_fee_head');
             setStudents(response.data);
         } catch (error) {
             console.error("Error fetching students:", error);
@@ -19,7 +19,7 @@ function Ledger() {
 
     const fetchStudents = async () => {
         try {
-            const response = await api.get(`students/?search=${searchTerm}`);
+            const response = await api.get(`students/autocomplete/?q=${encodeURIComponent(searchTerm)}&limit=20`);
             setStudents(response.data);
         } catch (error) {
             console.error("Error fetching students:", error);